@@ -1,32 +1,92 @@
 #! /usr/bin/env python3
 
+import mmap
 import sys
 import time
 from xml.dom import minidom
+import xml.parsers.expat
 import xml.etree.ElementTree as ET
 
+try:
+    import resource  # not available on Windows
+except ImportError:
+    resource = None
+
+
 def print_usage_and_bail():
     print(f"Usage: python {sys.argv[0]} <path_to_xml_file>")
     sys.exit(1)
 
 
+def peak_rss_mb() -> float:
+    if resource is None:
+        return float('nan')
+    # NOTE: ru_maxrss is reported in kilobytes on Linux, but in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return rss / (1024 * 1024)
+    return rss / 1024
+
+
+def report(name: str, elapsed: float):
+    # NOTE: peak RSS is process-wide and never decreases,
+    #       so it only grows if a benchmark exceeds all previous ones
+    print(f"{name}: {elapsed:.4f} seconds (peak RSS {peak_rss_mb():.1f} MB)")
+
+
 def benchmark_minidom(filename):
-    start = time.time()
+    # slow baseline: pure Python DOM, only kept for comparison
+    start = time.perf_counter()
     dom = minidom.parse(filename)
-    elapsed = time.time() - start
-    print(f"minidom: {elapsed:.2f} seconds")
+    elapsed = time.perf_counter() - start
+    report("minidom (slow baseline)", elapsed)
     return dom
 
 
 def benchmark_elementtree(filename):
-    start = time.time()
+    start = time.perf_counter()
     tree = ET.parse(filename)
     root = tree.getroot()
-    elapsed = time.time() - start
-    print(f"ElementTree: {elapsed:.2f} seconds")
+    elapsed = time.perf_counter() - start
+    report("ElementTree", elapsed)
     return tree
 
 
+def benchmark_elementtree_iterparse(filename):
+    # streaming: each element is released right after it was processed
+    start = time.perf_counter()
+    count = 0
+    for _, elem in ET.iterparse(filename, events=("end",)):
+        count += 1
+        elem.clear()
+    elapsed = time.perf_counter() - start
+    report(f"ElementTree iterparse ({count} elements)", elapsed)
+    return count
+
+
+def benchmark_expat(filename, chunk_size: int = 64 * 1024):
+    # SAX style lower bound: no tree is built at all
+    count = 0
+
+    def start_element(name, attrs):
+        nonlocal count
+        count += 1
+
+    start = time.perf_counter()
+    parser = xml.parsers.expat.ParserCreate()
+    parser.StartElementHandler = start_element
+    with open(filename, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            parser.Parse(chunk, False)
+    parser.Parse(b'', True)
+    elapsed = time.perf_counter() - start
+    report(f"expat ({count} elements)", elapsed)
+    return count
+
+
 def benchmark_lxml(filename):
     try:
         from lxml import etree as lxml_etree
@@ -37,22 +97,67 @@ def benchmark_lxml(filename):
 
     if not lxml_available:
         return None
-    start = time.time()
+    start = time.perf_counter()
     tree = lxml_etree.parse(filename)
     root = tree.getroot()
-    elapsed = time.time() - start
-    print(f"lxml: {elapsed:.2f} seconds")
+    elapsed = time.perf_counter() - start
+    report("lxml", elapsed)
     return tree
-    
+
+
+def benchmark_lxml_tuned(filename):
+    try:
+        from lxml import etree as lxml_etree
+    except ImportError:
+        print("lxml not installed — skipping tuned lxml benchmark")
+        return None
+
+    # no ID collection or entity resolution,
+    # the memory mapped file is handed to libxml2 as one contiguous buffer
+    # NOTE: lxml's fromstring() only accepts str/bytes, not buffer objects,
+    #       so the mapping is read into bytes in a single call
+    start = time.perf_counter()
+    parser = lxml_etree.XMLParser(collect_ids=False, resolve_entities=False, remove_blank_text=False)
+    with open(filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            root = lxml_etree.fromstring(mm.read(), parser)
+    elapsed = time.perf_counter() - start
+    report("lxml tuned (mmap)", elapsed)
+    return root
+
+
+def benchmark_lxml_iterparse(filename):
+    try:
+        from lxml import etree as lxml_etree
+    except ImportError:
+        print("lxml not installed — skipping lxml iterparse benchmark")
+        return None
+
+    # streaming: each element is released right after it was processed
+    start = time.perf_counter()
+    count = 0
+    for _, elem in lxml_etree.iterparse(filename, events=("end",), huge_tree=False):
+        count += 1
+        elem.clear(keep_tail=True)
+    elapsed = time.perf_counter() - start
+    report(f"lxml iterparse ({count} elements)", elapsed)
+    return count
+
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
         print_usage_and_bail()
-        
+
     filename = sys.argv[1]
-    
+
     print(f"Benchmarking parsing of {filename}...")
-    benchmark_minidom(filename)
-    benchmark_elementtree(filename)
-    benchmark_lxml(filename)
 
+    # NOTE: the streaming parsers run first, so their peak RSS
+    #       is not hidden by the DOM based parsers
+    benchmark_expat(filename)
+    benchmark_lxml_iterparse(filename)
+    benchmark_elementtree_iterparse(filename)
+    benchmark_lxml_tuned(filename)
+    benchmark_lxml(filename)
+    benchmark_elementtree(filename)
+    benchmark_minidom(filename)
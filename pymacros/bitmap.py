@@ -18,7 +18,6 @@
 
 from __future__ import annotations
 from dataclasses import dataclass
-from math import ceil
 import os
 import sys
 import tempfile
@@ -33,11 +32,94 @@ from klayout_plugin_utils.debugging import debug, Debugging
 from klayout_plugin_utils.base36 import *
 
 
+# KLayout string characters to pixel values, 0xff marks invalid characters
+_KLAYOUT_STRING_DECODE_TABLE = bytes(
+    1 if c == ord('*') else 0 if c == ord('.') else 0xff
+    for c in range(256)
+)
+
+# pixel values to KLayout string characters (any non-zero value is a set pixel)
+_KLAYOUT_STRING_ENCODE_TABLE = b'.' + b'*' * 255
+
+# packed byte to its 8 pixel values (0 or 1), most significant bit first
+_UNPACK_BITS_TABLE = tuple(
+    bytes((b >> (7 - i)) & 1 for i in range(8))
+    for b in range(256)
+)
+_unpack_bits_lookup = _UNPACK_BITS_TABLE.__getitem__  # bound once, not per call
+
+
+def _unpack_bits(packed: bytes) -> bytes:
+    """Expand 8 bits per byte (MSB first) into 1 byte (0 or 1) per bit."""
+    return b''.join(map(_unpack_bits_lookup, packed))
+
+# clears the padding bits of a row's last byte, indexed by the number of used bits (width % 8)
+_CLEAR_PADDING_TABLES = tuple(
+    bytes(b & (0xff << (8 - used_bits)) & 0xff for b in range(256))
+    for used_bits in range(8)
+)
+
+# pixel values to binary digits (any non-zero value is a set pixel)
+_PACK_BITS_DIGIT_TABLE = b'0' + b'1' * 255
+
+
+def _pack_bits(bits: bytes) -> bytes:
+    """Pack 1 byte (0 or 1) per bit into 8 bits per byte (MSB first), zero padded to full bytes."""
+    n_bytes = (len(bits) + 7) // 8
+    if n_bytes == 0:
+        return b''
+    # NOTE: parsing a base 2 string is linear in CPython, so this packs entirely in C
+    digits = bytes(bits).translate(_PACK_BITS_DIGIT_TABLE).ljust(n_bytes * 8, b'0')
+    return int(digits, 2).to_bytes(n_bytes, 'big')
+
+
 @dataclass(**({'slots': True} if sys.version_info >= (3, 10) else {}))
 class Bitmap:
     width: int
     height: int
-    data: bytearray  # flat, row-major, 0 or 1 per pixel
+    packed: bytearray  # row-major, 1 bit per pixel (MSB first), each row padded to full bytes (like PBM P4)
+    
+    @property
+    def row_bytes(self) -> int:
+        return (self.width + 7) // 8
+    
+    # ----------------------------------------
+    # Conversion to/from unpacked pixels
+    # ----------------------------------------
+    
+    @classmethod
+    def from_pixels(cls, width: int, height: int, pixels: bytes) -> Bitmap:
+        """
+        Create a bitmap from flat, row-major pixel values (1 byte per pixel, non-zero is a set pixel).
+        """
+        if width == 0 or height == 0:
+            return cls(width, height, bytearray())
+        
+        if width % 8 == 0:
+            return cls(width, height, bytearray(_pack_bits(pixels)))
+        
+        # each row is padded to full bytes
+        # NOTE: bytearray.join builds the result in place, without an intermediate bytes copy
+        packed = bytearray().join(
+            _pack_bits(pixels[y * width:(y + 1) * width])
+            for y in range(height)
+        )
+        return cls(width, height, packed)
+    
+    def pixels(self) -> bytes:
+        """
+        Flat, row-major pixel values (0 or 1 per pixel).
+        """
+        bits = _unpack_bits(self.packed)
+        row_stride = self.row_bytes * 8
+        if row_stride == self.width:
+            return bits
+        
+        # drop the row padding bits
+        return b''.join(
+            bits[y * row_stride:y * row_stride + self.width]
+            for y in range(self.height)
+        )
     
     # ----------------------------------------
     # Panelization
@@ -50,8 +132,9 @@ class Bitmap:
         tile_w = self.width
         tile_h = self.height
         
-        nx = ceil(min_w / tile_w)
-        ny = ceil(min_h / tile_h)
+        # integer ceil division
+        nx = -(-min_w // tile_w)
+        ny = -(-min_h // tile_h)
         
         panel_w = nx * tile_w
         panel_h = ny * tile_h
@@ -61,17 +144,28 @@ class Bitmap:
                   f"requested {min_w:.3f}x{min_h:3f} "
                   f"=> panel {panel_w}x{panel_h} ({nx}x{ny})")
         
-        panel_data = bytearray(panel_w * panel_h)
-        
-        tile_data = self.data
-        
-        for y in range(panel_h):
-            src_y = (y % tile_h) * tile_w
-            dst_y = y * panel_w
-            for x in range(panel_w):
-                panel_data[dst_y + x] = tile_data[src_y + (x % tile_w)]
-        
-        bitmap = Bitmap(panel_w, panel_h, panel_data)
+        # NOTE: hot-spot, avoid per-pixel Python loops,
+        #       repeat whole rows (horizontally) and the whole band of rows (vertically),
+        #       so all the copying is done by bytes repetition/join in C
+        if tile_w % 8 == 0:
+            # rows are whole bytes, so the packed rows can be repeated as they are
+            row_bytes = self.row_bytes
+            tile_packed = bytes(self.packed)
+            band = bytearray().join(
+                tile_packed[y * row_bytes:(y + 1) * row_bytes] * nx
+                for y in range(tile_h)
+            )
+        else:
+            # rows would have to be bit-shifted, so repeat the unpacked rows and pack once
+            tile_pixels = self.pixels()
+            band_pixels = b''.join(
+                tile_pixels[y * tile_w:(y + 1) * tile_w] * nx
+                for y in range(tile_h)
+            )
+            band = Bitmap.from_pixels(panel_w, tile_h, band_pixels).packed
+        panel_packed = band * ny  # band is a bytearray, so no extra copy is needed
+
+        bitmap = Bitmap(panel_w, panel_h, panel_packed)
         return bitmap
         
     # ----------------------------------------
@@ -100,39 +194,34 @@ class Bitmap:
         
         width = len(lines[0])
         height = len(lines)
-        data = bytearray(width * height)
         
-        rows: List[bytearray] = []
         for y, line in enumerate(lines):
             if len(line) != width:
                 raise ValueError(f"inconsistent line length on line {y}: "
                                  f"{len(line)} != {width}")
-
-            row_offset = y * width
-            for x, c in enumerate(line):
-                if c == '*':
-                    data[row_offset + x] = 1
-                elif c == '.':
-                    pass
-                else:
-                    raise ValueError(f"invalid character {c!r} on line {y}")
         
-        return cls(width, height, data)
+        # NOTE: translate the whole pattern at once and validate it with a single search,
+        #       non-ASCII characters are replaced by '?' (one per character),
+        #       so the index of the invalid byte still matches the character index
+        text = ''.join(lines)
+        pixels = text.encode('ascii', 'replace').translate(_KLAYOUT_STRING_DECODE_TABLE)
+        invalid_idx = pixels.find(0xff)
+        if invalid_idx != -1:
+            raise ValueError(f"invalid character {text[invalid_idx]!r} "
+                             f"on line {invalid_idx // width}")
+        
+        return cls.from_pixels(width, height, pixels)
     
     def to_klayout_string(self) -> str:
         if self.width == 0 or self.height == 0:
             return ""
 
-        lines: List[str] = []
-        for y in range(self.height):
-            row_offset = y * self.width
-            line = ''.join(
-                '*' if self.data[row_offset + x] else '.'
-                for x in range(self.width)
-            )
-            lines.append(line)
-
-        return "\n".join(lines)
+        w = self.width
+        encoded = self.pixels().translate(_KLAYOUT_STRING_ENCODE_TABLE).decode('ascii')
+        return "\n".join(
+            encoded[y * w:(y + 1) * w]
+            for y in range(self.height)
+        )
         
     # ----------------------------------------
     # PBM (binary) read/write
@@ -162,41 +251,34 @@ class Bitmap:
                 width_height += f.readline().split()
             width, height = map(int, width_height)
             
-            # Read bitmap data
-            data = bytearray(width * height)
+            # Read bitmap data, each row is padded to full bytes,
+            # exactly like the packed bitmap data
             row_bytes = (width + 7) // 8
-            for y in range(height):
-                row_data = f.read(row_bytes)
-                for x in range(width):
-                    byte_idx = x // 8
-                    bit_idx = 7 - (x % 8)
-                    if row_data[byte_idx] & (1 << bit_idx):
-                        data[y * width + x] = 1
-            return cls(width, height, data)
+            packed = bytearray(f.read(row_bytes * height))
+            if len(packed) != row_bytes * height:
+                raise ValueError(f"Truncated PBM data, expected {row_bytes * height} bytes, "
+                                 f"got {len(packed)}")
+            
+            if width % 8 != 0:
+                # the padding bits are unspecified, clear them so equal bitmaps compare equal
+                # NOTE: the last byte of each row is an extended slice, masked with one translate
+                last_bytes = slice(row_bytes - 1, None, row_bytes)
+                packed[last_bytes] = packed[last_bytes].translate(_CLEAR_PADDING_TABLES[width % 8])
+            return cls(width, height, packed)
+    
+    def to_pbm_bytes(self) -> bytes:
+        """
+        Encode the bitmap as PBM (binary, P4) file contents.
+        """
+        header = f"P4\n{self.width} {self.height}\n".encode('ascii')
+        return header + self.packed
     
     def to_pbm(self, path: str):
         """
         Write the bitmap to a PBM (binary, P4) file.
         """
         with open(path, 'wb') as f:
-            f.write(f"P4\n{self.width} {self.height}\n".encode('ascii'))
-            
-            row_bytes = (self.width + 7) // 8
-            for y in range(self.height):
-                byte = 0
-                bits_filled = 0
-                row_offset = y * self.width
-                for x in range(self.width):
-                    bit = self.data[row_offset + x]
-                    byte = (byte << 1) | (bit & 1)
-                    bits_filled += 1
-                    if bits_filled == 8:
-                        f.write(bytes([byte]))
-                        byte = 0
-                        bits_filled = 0
-                if bits_filled > 0:  # pad remaining bits
-                    byte <<= (8 - bits_filled)
-                    f.write(bytes([byte]))
+            f.write(self.to_pbm_bytes())
 
     # ----------------------------------------
     # Convert to/from compact filename
@@ -205,34 +287,28 @@ class Bitmap:
     @staticmethod
     def bits_to_bytes(bits: bytearray) -> bytearray:
         """Convert 1-bit-per-byte array into actual bytes (8 bits per byte)."""
-        n = len(bits)
-        out = bytearray((n + 7) // 8)
-        for i, bit in enumerate(bits):
-            if bit:
-                byte_index = i // 8
-                bit_index = 7 - (i % 8)  # store most significant bit first
-                out[byte_index] |= 1 << bit_index
-        return out
+        return bytearray(_pack_bits(bits))  # store most significant bit first
 
     @staticmethod      
     def bytes_to_bits(data: bytes, n_bits: int) -> bytearray:
-        out = bytearray(n_bits)
-        for i in range(n_bits):
-            byte_index = i // 8
-            bit_index = 7 - (i % 8)
-            out[i] = (data[byte_index] >> bit_index) & 1
-        return out
+        if len(data) * 8 < n_bits:
+            raise ValueError(f"Not enough data for {n_bits} bits: {len(data)} bytes")
+        return bytearray(_unpack_bits(data)[:n_bits])
     
     @classmethod
     def from_compact_filename(cls, s: str) -> Bitmap:
+        # NOTE: the filename packs the pixels without row padding,
+        #       which only matches the packed bitmap data if the width is a multiple of 8
         try:
             w_str, h_str, data_str = s.split('_', 2)
             width = base36_to_int(w_str)
             height = base36_to_int(h_str)
             n_bits = width * height
-            packed = base36_to_bytes(data_str)
-            data = cls.bytes_to_bits(packed, n_bits)
-            return cls(width, height, data)
+            data = base36_to_bytes(data_str)
+            if width % 8 == 0 and len(data) == n_bits // 8:
+                return cls(width, height, bytearray(data))
+            pixels = cls.bytes_to_bits(data, n_bits)
+            return cls.from_pixels(width, height, pixels)
         except Exception as e:
             raise ValueError(f"Invalid compact filename: {s}") from e
             traceback.print_exc()
@@ -241,8 +317,11 @@ class Bitmap:
         """Compact, reversible filename-safe string using only [0-9a-z]."""
         w_str = int_to_base36(self.width)
         h_str = int_to_base36(self.height)
-        packed = self.bits_to_bytes(self.data)
-        data_str = bytes_to_base36(packed)
+        if self.width % 8 == 0:
+            data = self.packed
+        else:
+            data = self.bits_to_bytes(self.pixels())
+        data_str = bytes_to_base36(data)
         return f"{w_str}_{h_str}_{data_str}"
 
     # ----------------------------------------
@@ -250,11 +329,15 @@ class Bitmap:
     # ----------------------------------------
     
     def get(self, x: int, y: int) -> int:
-        return self.data[y * self.width + x]
+        return (self.packed[y * self.row_bytes + (x >> 3)] >> (7 - (x & 7))) & 1
     
     def set(self, x: int, y: int, value: int):
-        self.data[y * self.width + x] = 1 if value else 0
-
+        i = y * self.row_bytes + (x >> 3)
+        mask = 0x80 >> (x & 7)
+        if value:
+            self.packed[i] |= mask
+        else:
+            self.packed[i] &= ~mask & 0xff
     
 #--------------------------------------------------------------------------------
 
@@ -285,7 +368,7 @@ class BitmapTests(unittest.TestCase):
         b = Bitmap.from_klayout_string("")
         self.assertEqual(0, b.width)
         self.assertEqual(0, b.height)
-        self.assertEqual(bytearray(), b.data)
+        self.assertEqual(bytearray(), b.packed)
     
     def test_get_set(self):
         b = Bitmap.from_klayout_string("...\n...")
@@ -311,7 +394,7 @@ class BitmapTests(unittest.TestCase):
             
             self.assertEqual(original.width, loaded.width)
             self.assertEqual(original.height, loaded.height)
-            self.assertEqual(original.data, loaded.data)
+            self.assertEqual(original.packed, loaded.packed)
             self.assertEqual('.*..\n*.**\n..*.', loaded.to_klayout_string())            
         finally:
             os.remove(path)
@@ -332,7 +415,7 @@ class BitmapTests(unittest.TestCase):
         
         self.assertEqual(b.width, b2.width)
         self.assertEqual(b.height, b2.height)
-        self.assertEqual(b.data, b2.data)
+        self.assertEqual(b.packed, b2.packed)
         self.assertEqual(b.to_klayout_string(), b2.to_klayout_string())
 
     def test_compact_filename_empty_bitmap(self):
@@ -341,15 +424,15 @@ class BitmapTests(unittest.TestCase):
         b2 = Bitmap.from_compact_filename(name)
         self.assertEqual(b.width, b2.width)
         self.assertEqual(b.height, b2.height)
-        self.assertEqual(b.data, b2.data)
+        self.assertEqual(b.packed, b2.packed)
 
     def test_compact_filename_large_bitmap(self):
         # 16x16 checkerboard
-        data = bytearray((i + j) % 2 for j in range(16) for i in range(16))
-        b = Bitmap(16, 16, data)
+        pixels = bytes((i + j) % 2 for j in range(16) for i in range(16))
+        b = Bitmap.from_pixels(16, 16, pixels)
         name = b.to_compact_filename()
         b2 = Bitmap.from_compact_filename(name)
-        self.assertEqual(b.data, b2.data)
+        self.assertEqual(b.packed, b2.packed)
         self.assertEqual(b.width, b2.width)
         self.assertEqual(b.height, b2.height)
         
@@ -395,7 +478,28 @@ class BitmapTests(unittest.TestCase):
 .*..*..*.
 ..*..*..*"""
         
-        self.assertEqual(expected_s, panel.to_klayout_string())            
+        self.assertEqual(expected_s, panel.to_klayout_string())
+
+    def test_panelize_byte_aligned(self):
+        s = """
+            *.......
+            .*......
+            ........
+            """
+        b = Bitmap.from_klayout_string(s)
+
+        panel = b.panelize(min_w=9, min_h=4)  # -> 16x6
+        self.assertEqual(16, panel.width)
+        self.assertEqual(6, panel.height)
+
+        expected_s = """*.......*.......
+.*.......*......
+................
+*.......*.......
+.*.......*......
+................"""
+
+        self.assertEqual(expected_s, panel.to_klayout_string())
         
 
 if __name__ == "__main__":
@@ -16,12 +16,15 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 #--------------------------------------------------------------------------------
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 import subprocess
 import tempfile
 import os
 from pathlib import Path
 import sys
+from typing import *
 
 import pya
 
@@ -40,7 +43,7 @@ class Interpolation(StrEnum):
     LINEAR = 'linear'
     
 
-@dataclass
+@dataclass(frozen=True)
 class BitmapVectorizerSettings:
     # preprocessing options
     hpf: int = 0  # high pass filter, 0 to turn off
@@ -57,64 +60,176 @@ class BitmapVectorizerSettings:
 
 class BitmapVectorizer:
     @staticmethod
-    def convert_bitmap_to_svg(input_bitmap_path: Path,
-                              preprocessed_bitmap_path: Path,
-                              svg_path: Path,
-                              settings: BitmapVectorizerSettings = BitmapVectorizerSettings()):
+    @lru_cache(maxsize=None)
+    def _mkbitmap_base_argv(settings: BitmapVectorizerSettings) -> Tuple[str, ...]:
         """
-        Convert a bitmap to a list of QPainterPath objects using Potrace.
+        NOTE: the flags only depend on the (frozen) settings, so they are built once
         """
-        
-        # -----------------------------
-        # Load and preprocess image
-        # -----------------------------
-
-        mkbitmap_cmd = [
-            'mkbitmap',
-            '--output', str(preprocessed_bitmap_path.resolve()),
-        ]
-
         if settings.hpf <= 0:
-            mkbitmap_cmd += ['--nofilter']
+            filter_argv = ('--nofilter',)
         else:
-            mkbitmap_cmd += ['--filter', str(settings.hpf)]
+            filter_argv = ('--filter', str(settings.hpf))
         
-        mkbitmap_cmd += [
+        return filter_argv + (
             '--threshold', str(float(settings.threshold) / 256.0),
             '--scale', str(settings.scale_factor),
             '--cubic',
-            str(input_bitmap_path.resolve())
+        )
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _potrace_base_argv(settings: BitmapVectorizerSettings) -> Tuple[str, ...]:
+        return (
+            '--turdsize', str(settings.turdsize),
+            '--alphamax', str(settings.alphamax),
+            '--opttolerance', str(settings.opttolerance),
+            '--turnpolicy', settings.turnpolicy.value
+        )
+    
+    @staticmethod
+    def _mkbitmap_cmd(settings: BitmapVectorizerSettings,
+                      input_bitmap_path: Optional[Path] = None) -> List[str]:
+        """
+        NOTE: the preprocessed bitmap is written to stdout,
+              without input_bitmap_path, mkbitmap reads the bitmap from stdin
+        """
+        mkbitmap_cmd = [
+            'mkbitmap',
+            '--output', '-',
+            *BitmapVectorizer._mkbitmap_base_argv(settings)
         ]
-
-        if Debugging.DEBUG:
-            debug(f"BitmapVectorizer.convert_bitmap_to_svg: running {' '.join(mkbitmap_cmd)}")
-
-        result = subprocess.run(mkbitmap_cmd, check=True)
-
-        if Debugging.DEBUG:
-            debug(f"BitmapVectorizer.convert_bitmap_to_svg: mkbitmap terminated "
-                  f"with return code {result.returncode}")
         
-        # -----------------------------
-        # Run Potrace CLI
-        # -----------------------------
+        if input_bitmap_path is not None:
+            # NOTE: abspath is purely lexical, unlike Path.resolve() it issues no stat calls
+            mkbitmap_cmd.append(os.path.abspath(input_bitmap_path))
         
-        potrace_cmd = [
+        return mkbitmap_cmd
+    
+    @staticmethod
+    def _potrace_cmd(svg_path: Path,
+                     settings: BitmapVectorizerSettings) -> List[str]:
+        """
+        NOTE: potrace reads the preprocessed bitmap from stdin
+        """
+        return [
             'potrace', 
-            str(preprocessed_bitmap_path),
+            '-',
             '--svg', 
-            '--output', str(svg_path.resolve()),
-            '--turdsize', str(settings.turdsize),
-            '--alphamax', str(settings.alphamax),
-            '--opttolerance', str(settings.opttolerance),
-            '--turnpolicy', settings.turnpolicy.value
+            '--output', os.path.abspath(svg_path),
+            *BitmapVectorizer._potrace_base_argv(settings)
         ]
-
+    
+    @staticmethod
+    def _kill_processes(*processes: subprocess.Popen):
+        """
+        Kill and reap the processes of a pipeline that can't be completed anymore
+        """
+        for process in processes:
+            if process.stdin is not None:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+            process.kill()
+        for process in processes:
+            process.wait()
+    
+    @staticmethod
+    def _run_pipeline(mkbitmap_cmd: List[str],
+                      potrace_cmd: List[str],
+                      input: Optional[bytes] = None):
+        """
+        Run mkbitmap | potrace, so the preprocessed bitmap never touches the disk.
+        """
         if Debugging.DEBUG:
-            debug(f"BitmapVectorizer.convert_bitmap_to_svg: running {' '.join(potrace_cmd)}")
+            debug(f"BitmapVectorizer: running {' '.join(mkbitmap_cmd)} | {' '.join(potrace_cmd)}")
+        
+        mkbitmap = subprocess.Popen(mkbitmap_cmd,
+                                    stdin=subprocess.DEVNULL if input is None else subprocess.PIPE,
+                                    stdout=subprocess.PIPE)
+        try:
+            potrace = subprocess.Popen(potrace_cmd, stdin=mkbitmap.stdout)
+        except BaseException:
+            # NOTE: e.g. potrace is not installed, don't leave mkbitmap behind
+            BitmapVectorizer._kill_processes(mkbitmap)
+            raise
+        finally:
+            mkbitmap.stdout.close()  # potrace owns the read end now
+        
+        # NOTE: potrace drains the pipe concurrently, so writing all input at once can't deadlock
+        if input is not None:
+            try:
+                # mkbitmap failing early is reported by its return code below
+                try:
+                    mkbitmap.stdin.write(input)
+                except BrokenPipeError:
+                    pass
+                try:
+                    mkbitmap.stdin.close()
+                except BrokenPipeError:
+                    pass
+            except BaseException:
+                BitmapVectorizer._kill_processes(mkbitmap, potrace)
+                raise
+        
+        potrace.wait()
+        mkbitmap.wait()
         
-        result = subprocess.run(potrace_cmd, check=True)
-
         if Debugging.DEBUG:
-            debug(f"BitmapVectorizer.convert_bitmap_to_svg: potrace terminated "
-                  f"with return code {result.returncode}")
+            debug(f"BitmapVectorizer: mkbitmap terminated with return code {mkbitmap.returncode}, "
+                  f"potrace terminated with return code {potrace.returncode}")
+        
+        if mkbitmap.returncode != 0:
+            raise subprocess.CalledProcessError(mkbitmap.returncode, mkbitmap_cmd)
+        if potrace.returncode != 0:
+            raise subprocess.CalledProcessError(potrace.returncode, potrace_cmd)
+    
+    @staticmethod
+    def convert_bitmap_to_svg(input_bitmap_path: Path,
+                              svg_path: Path,
+                              settings: BitmapVectorizerSettings = BitmapVectorizerSettings()):
+        """
+        Convert a PBM bitmap file to an SVG file using mkbitmap and Potrace.
+        """
+        BitmapVectorizer._run_pipeline(BitmapVectorizer._mkbitmap_cmd(settings, input_bitmap_path),
+                                       BitmapVectorizer._potrace_cmd(svg_path, settings))
+
+    @staticmethod
+    def convert_bitmap_data_to_svg(bitmap: Bitmap,
+                                   svg_path: Path,
+                                   settings: BitmapVectorizerSettings = BitmapVectorizerSettings()):
+        """
+        Convert an in-memory bitmap to an SVG file using mkbitmap and Potrace.
+        
+        The bitmap is streamed to mkbitmap's stdin, so there is no PBM file round trip.
+        """
+        BitmapVectorizer._run_pipeline(BitmapVectorizer._mkbitmap_cmd(settings),
+                                       BitmapVectorizer._potrace_cmd(svg_path, settings),
+                                       input=bitmap.to_pbm_bytes())
+
+    @staticmethod
+    def convert_many(jobs: Iterable[Tuple[Bitmap, Path]],
+                     settings: BitmapVectorizerSettings = BitmapVectorizerSettings(),
+                     max_workers: Optional[int] = None,
+                     on_converted: Optional[Callable[[Path], Any]] = None):
+        """
+        Convert many in-memory bitmaps to SVG files concurrently.
+        
+        Each job is a tuple of (bitmap, svg_path),
+        on_converted (if given) is called with the svg_path in the worker thread
+        right after the conversion, so post-processing overlaps the remaining subprocesses.
+        
+        NOTE: the actual work happens in the mkbitmap/potrace subprocesses,
+              so a thread pool suffices to overlap them
+              (a process pool would have to re-launch KLayout's embedded interpreter)
+        """
+        def convert(job: Tuple[Bitmap, Path]):
+            bitmap, svg_path = job
+            BitmapVectorizer.convert_bitmap_data_to_svg(bitmap, svg_path, settings)
+            if on_converted is not None:
+                on_converted(svg_path)
+        
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            # NOTE: consume the results, so the first failure is re-raised here
+            for _ in executor.map(convert, jobs):
+                pass
@@ -17,7 +17,8 @@
 #--------------------------------------------------------------------------------
 
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cached_property
 from typing import *
 import unittest
 
@@ -42,6 +43,47 @@ class DesignInfo:
     
     settings: VectorFileExportSettings
     
+    # derived scalars, computed once in __post_init__
+    scale_um_to_mm: float = field(init=False, repr=False, compare=False)
+    fig_width_mm: float = field(init=False, repr=False, compare=False)
+    fig_height_mm: float = field(init=False, repr=False, compare=False)
+    scaling: float = field(init=False, repr=False, compare=False)
+    fig_width_pt: float = field(init=False, repr=False, compare=False)   # NOTE: Used during export
+    fig_height_pt: float = field(init=False, repr=False, compare=False)
+    scale_um_to_pt: float = field(init=False, repr=False, compare=False)
+    um_per_pixel: float = field(init=False, repr=False, compare=False)
+    min_feature_size_um: float = field(init=False, repr=False, compare=False)
+    simplify_tolerance_um: float = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # NOTE: these are read in the export hot path,
+        #       plain attributes are cheaper than (cached) property lookups
+        if self.settings.content_scaling_style == ContentScaling.FIGURE_WIDTH_MM:
+            # Figure width in mm / layout width in µm
+            self.scale_um_to_mm = self.settings.content_scaling_value / self.width_um
+        elif self.settings.content_scaling_style == ContentScaling.SCALING:
+            # User gave scaling factor directly (mm / µm)
+            self.scale_um_to_mm = self.settings.content_scaling_value / 1e3
+        else:
+            raise NotImplementedError(f"Unhandled enum case {self.settings.content_scaling_style}")
+        
+        self.fig_width_mm = self.width_um * self.scale_um_to_mm
+        self.fig_height_mm = self.height_um * self.scale_um_to_mm
+        self.scaling = self.scale_um_to_mm * 1e3
+        
+        # NOTE: scale_um_to_pt is only to be used for "export" with QPainter
+        #       we want to keep things metric as far as possible
+        #       (derived from the mm scale, so an empty layout doesn't divide by zero)
+        self.fig_width_pt = self.fig_width_mm / MM_PER_PT
+        self.scale_um_to_pt = self.scale_um_to_mm / MM_PER_PT
+        self.fig_height_pt = self.scale_um_to_pt * self.height_um
+        
+        # How many µm does one rendered pixel represent in the exported figure?
+        # In QPainter export: 1 pt == 1 pixel
+        self.um_per_pixel = 1.0 / self.scale_um_to_pt if self.scale_um_to_pt else float('inf')
+        self.min_feature_size_um = self.um_per_pixel * 2  # Features smaller than 2 pixels won't be visible
+        self.simplify_tolerance_um = self.um_per_pixel * 0.5  # Simplify to half-pixel precision
+    
     @classmethod
     def for_layout_view(cls, 
                         layout_view: pya.LayoutView,
@@ -58,13 +100,25 @@ class DesignInfo:
             settings=settings
         )
     
+    @cached_property
+    def _indexed_layer_properties(self) -> List[Tuple[int, pya.LayerPropertiesNodeRef]]:
+        # NOTE: layer_index() is a binding call, only call it once per layer,
+        #       and walk the layer properties tree only once per export
+        return [
+            (idx, lref)
+            for lref in self.layout_view.each_layer()
+            if lref.valid and (idx := lref.layer_index()) != -1
+        ]
+    
     @cached_property
     def all_layer_indexes(self) -> List[int]:
-        idxs = []
-        for lref in self.layout_view.each_layer():
-            if lref.valid and lref.layer_index() != -1:
-                idxs.append(lref.layer_index())
-        return idxs
+        return [idx for idx, _ in self._indexed_layer_properties]
+    
+    @cached_property
+    def layer_properties_by_index(self) -> Dict[int, pya.LayerPropertiesNodeRef]:
+        # NOTE: only the layers of all_layer_indexes, hidden ones included
+        #       (whether they are exported depends on the layer selection and text modes)
+        return dict(self._indexed_layer_properties)
     
     def _get_layer_indexes(self, topic: str, layer_list: str) -> List[int]:
         layer_indexes: List[int] = []
@@ -72,19 +126,22 @@ class DesignInfo:
         layer_list_parse_result = LayerList.parse_layer_list_string(layer_list)
         if len(layer_list_parse_result.errors) == 0:
             for lp in self.layout_view.each_layer():
-                if not lp.valid or lp.layer_index() == -1:
+                if not lp.valid:
+                    continue
+                idx = lp.layer_index()
+                if idx == -1:
                     continue
                 
                 if layer_list_parse_result.result.contains(lp):
                     if Debugging.DEBUG:
-                        debug(f"Found layer {lp.source_layer}/{lp.source_datatype} (index {lp.layer_index()}), in {topic} string list '{layer_list}'")
-                    layer_indexes.append(lp.layer_index())
+                        debug(f"Found layer {lp.source_layer}/{lp.source_datatype} (index {idx}), in {topic} string list '{layer_list}'")
+                    layer_indexes.append(idx)
         else:
-            raise ValueError(f"ERROR: failed to parse {topic} {self.settings.custom_layers} due to errors:\n{layer_list_parse_result.errors}")
-            layer_indexes = []
+            raise ValueError(f"ERROR: failed to parse {topic} {layer_list} due to errors:\n{layer_list_parse_result.errors}")
         
         if len(layer_indexes) == 0:
-            debug(f"No layer indexes found for topic '{topic}', layer list string '{layer_list}', parse result: {layer_list_parse_result}")
+            if Debugging.DEBUG:
+                debug(f"No layer indexes found for topic '{topic}', layer list string '{layer_list}', parse result: {layer_list_parse_result}")
             
         return layer_indexes
     
@@ -105,67 +162,6 @@ class DesignInfo:
     @property
     def height_um(self) -> float:
         return self.bbox.height()
-
-    # --------------------------------------------------------
-    @cached_property
-    def scale_um_to_mm(self) -> float:
-        if self.settings.content_scaling_style == ContentScaling.FIGURE_WIDTH_MM:
-            # Figure width in mm / layout width in µm
-            return self.settings.content_scaling_value / self.width_um
-        elif self.settings.content_scaling_style == ContentScaling.SCALING:
-            # User gave scaling factor directly (mm / µm)
-            return self.settings.content_scaling_value / 1e3
-        else:
-            raise NotImplementedError(f"Unhandled enum case {self.settings.content_scaling_style}")
-            
-    @cached_property
-    def fig_width_mm(self) -> float:
-        return self.width_um * self.scale_um_to_mm
-
-    @cached_property
-    def fig_height_mm(self) -> float:
-        return self.height_um * self.scale_um_to_mm
-            
-    @cached_property
-    def scaling(self) -> float:
-        return self.scale_um_to_mm * 1e3
-    
-    # --------------------------------------------------------
-    
-    @cached_property
-    def fig_width_pt(self) -> float:
-        """
-        NOTE: Used during export
-        """
-        return self.fig_width_mm / MM_PER_PT
-
-    @cached_property
-    def fig_height_pt(self) -> float:
-        return self.scale_um_to_pt * self.height_um
-            
-    @cached_property
-    def scale_um_to_pt(self) -> float:
-        """
-        NOTE: this is only to be used for "export" with QPainter
-              we want to keep things metric as far as possible
-        """
-        return self.fig_width_pt / self.width_um
-        
-    @cached_property
-    def um_per_pixel(self) -> float:
-        """
-        How many µm does one rendered pixel represent in the exported figure?
-        """
-        # In QPainter export: 1 pt == 1 pixel
-        return 1.0 / self.scale_um_to_pt
-
-    @cached_property
-    def min_feature_size_um(self):
-        return self.um_per_pixel * 2  # Features smaller than 2 pixels won't be visible
-    
-    @cached_property
-    def simplify_tolerance_um(self):
-        return self.um_per_pixel * 0.5  # Simplify to half-pixel precision
         
 
 #--------------------------------------------------------------------------------
@@ -16,7 +16,10 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 #--------------------------------------------------------------------------------
 
+import dataclasses
+import json
 import traceback
+from typing import *
 
 import pya
 
@@ -29,6 +32,19 @@ CONFIG_KEY__VECTOR_FILE_EXPORT_SETTINGS = 'klayout_vector_file_export_settings'
 
 
 class PreviousUISettings:
+    # NOTE: (config string, settings parsed from it) of the last load()/save()
+    _cached: Optional[Tuple[str, VectorFileExportSettings]] = None
+    
+    @staticmethod
+    def parse_config_str(settings_str: str) -> VectorFileExportSettings:
+        # NOTE: settings are stored as a single JSON object,
+        #       older versions stored them packed by pya.AbstractMenu.pack_key_binding
+        if settings_str.lstrip().startswith('{'):
+            d = json.loads(settings_str)
+        else:
+            d = pya.AbstractMenu.unpack_key_binding(settings_str)
+        return VectorFileExportSettings.from_dict(d)
+    
     @staticmethod
     def load() -> VectorFileExportSettings:
         mw = pya.MainWindow.instance()
@@ -38,8 +54,14 @@ class PreviousUISettings:
             settings_str = mw.get_config(CONFIG_KEY__VECTOR_FILE_EXPORT_SETTINGS)
             settings = VectorFileExportSettings()        
             if settings_str is not None:
-                d = pya.AbstractMenu.unpack_key_binding(settings_str)
-                settings = VectorFileExportSettings.from_dict(d)
+                cached = PreviousUISettings._cached
+                if cached is not None and cached[0] == settings_str:
+                    settings = cached[1]
+                else:
+                    settings = PreviousUISettings.parse_config_str(settings_str)
+                    PreviousUISettings._cached = (settings_str, settings)
+                # NOTE: callers may modify the returned settings, the cached instance must stay untouched
+                settings = dataclasses.replace(settings)
         except Exception as e:
             print(f"ERROR: Failed to restore export settings, proceeding with defaults due to exception: {e}")
             traceback.print_exc()
@@ -50,7 +72,15 @@ class PreviousUISettings:
     def save(settings: VectorFileExportSettings):
         mw = pya.MainWindow.instance()
         
-        settings_str = pya.AbstractMenu.pack_key_binding(settings.dict())
+        settings_str = json.dumps(settings.dict(), separators=(',', ':'))
+        
+        # NOTE: writing the config also notifies the plugin factory (which rebuilds its menu),
+        #       so it is skipped if the last loaded / saved config string is unchanged
+        cached = PreviousUISettings._cached
+        if cached is not None and cached[0] == settings_str:
+            return
+        
         mw.set_config(CONFIG_KEY__VECTOR_FILE_EXPORT_SETTINGS, settings_str)
+        PreviousUISettings._cached = (settings_str, dataclasses.replace(settings))
     
     
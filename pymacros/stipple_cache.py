@@ -17,30 +17,62 @@
 #--------------------------------------------------------------------------------
 
 from __future__ import annotations
-from dataclasses import dataclass
+from collections import OrderedDict
 from functools import cached_property
+import hashlib
+import mmap
 import os
 from pathlib import Path
+import pickle
+import shutil
+import sys
 from typing import *
 
 import pya
 
+from klayout_plugin_utils.debugging import debug, Debugging
+
 from bitmap import Bitmap
 from bitmap_vectorizer import BitmapVectorizer
 from exception import ExportCancelledError
 from progress_reporter import ProgressReporter
 from stipple import Stipple, StippleString, StipplePanel
-from svg_painter import convert_svg_to_qpainter_paths
+from svg_painter import SvgPathData, parse_svg_path_data
+
+
+# NOTE: bump whenever the pickled SvgPathData layout changes,
+#       persisted path data of other versions is re-created from the SVG
+PATH_DATA_CACHE_VERSION = 2
+
+STIPPLE_SVG_NAME = 'stipple.svg'
+STIPPLE_PATH_DATA_NAME = 'stipple.paths.pickle'
+
+
+# NOTE: interned strings instead of a frozen dataclass,
+#       their hash is computed once and equal keys compare by identity
+StippleCacheKey = str
+
 
+def is_complete_svg(svg_path: Path) -> bool:
+    """
+    NOTE: an interrupted potrace run (killed, crashed) can leave an empty SVG behind,
+          such a file is treated like a missing one, so the panel is vectorized again
+    """
+    try:
+        return os.stat(svg_path).st_size > 0
+    except FileNotFoundError:
+        return False
 
-@dataclass(frozen=True) 
-class StippleCacheKey:
-    tile_stipple_id: str
-    width: int
-    height: int
+
+def stipple_cache_key(tile_stipple_id: str, width: int, height: int) -> StippleCacheKey:
+    return sys.intern(f"{tile_stipple_id}\x00{width}\x00{height}")
 
 
 class StippleCache:
+    # NOTE: upper bound of panels kept in memory, the least recently used ones
+    #       are evicted (their path data stays persisted next to the SVG)
+    MAX_CACHED_PANELS = 2048
+    
     @classmethod
     def instance(cls) -> StippleCache:
         if not hasattr(cls, '_instance'):
@@ -54,7 +86,7 @@ class StippleCache:
         return BASE_PATH
     
     def __init__(self):
-        self._painter_path_cache: Dict[StippleCacheKey, List[pya.QPainterPath]] = {}
+        self._painter_path_cache: OrderedDict[StippleCacheKey, List[pya.QPainterPath]] = OrderedDict()
 
     def panelize(self, 
                  stipple: Stipple,
@@ -63,31 +95,124 @@ class StippleCache:
                  progress_reporter: Optional[ProgressReporter]) -> StipplePanel:
         panel_bitmap = stipple.bitmap.panelize(min_w, min_h)
         
-        key = StippleCacheKey(stipple.id, panel_bitmap.width, panel_bitmap.height)
-        
-        stipple_panel_dir = self.cache_base_path / stipple.id / f"{panel_bitmap.width}x{panel_bitmap.height}"
-        stipple_panel_dir.mkdir(parents=True, exist_ok=True)
+        key = stipple_cache_key(stipple.id, panel_bitmap.width, panel_bitmap.height)
         
         paths = self._painter_path_cache.get(key)
         if paths is None:
+            stipple_panel_dir = self._panel_dir(stipple, panel_bitmap)
             svg_path = self._get_or_create_svg_for_bitmap(panel_bitmap, stipple_panel_dir)
             
-            paths = convert_svg_to_qpainter_paths(svg_path, progress_reporter)
+            path_data = self._load_or_create_path_data(svg_path, progress_reporter)
+            paths = [pd.to_qpainter_path() for pd in path_data]
             
             self._painter_path_cache[key] = paths
+            if len(self._painter_path_cache) > self.MAX_CACHED_PANELS:
+                self._painter_path_cache.popitem(last=False)
+        else:
+            self._painter_path_cache.move_to_end(key)
         
         return StipplePanel(stipple, panel_bitmap.width, panel_bitmap.height, paths)
     
+    def prefetch(self, panel_requests: Iterable[Tuple[Stipple, int, int]]):
+        """
+        Vectorize the not yet persisted SVGs of several (stipple, min_w, min_h) panels concurrently,
+        so the following panelize() calls only have to load them.
+        
+        The path data of each new SVG is parsed and persisted as soon as its potrace run finished,
+        while the other panels are still being vectorized.
+        """
+        jobs: List[Tuple[Bitmap, Path]] = []
+        seen_svg_paths: Set[Path] = set()
+        for stipple, min_w, min_h in panel_requests:
+            panel_bitmap = stipple.bitmap.panelize(min_w, min_h)
+            if stipple_cache_key(stipple.id, panel_bitmap.width, panel_bitmap.height) in self._painter_path_cache:
+                continue
+            
+            svg_path = self._panel_dir(stipple, panel_bitmap) / STIPPLE_SVG_NAME
+            if svg_path in seen_svg_paths or is_complete_svg(svg_path):
+                continue
+            
+            seen_svg_paths.add(svg_path)
+            jobs.append((panel_bitmap, svg_path))
+        
+        if Debugging.DEBUG:
+            debug(f"StippleCache.prefetch: vectorizing {len(jobs)} stipple panels")
+        
+        if jobs:
+            BitmapVectorizer.convert_many(jobs,
+                                          on_converted=lambda svg_path: self._load_or_create_path_data(svg_path, None))
+    
+    def _panel_dir(self, stipple: Stipple, panel_bitmap: Bitmap) -> Path:
+        """
+        The panel directories are content addressed by the panel bitmap,
+        so different stipples that panelize to the same bitmap share one SVG
+        """
+        panel_id = hashlib.sha256(panel_bitmap.to_pbm_bytes()).hexdigest()
+        stipple_panel_dir = self.cache_base_path / 'panels' / panel_id
+        if not stipple_panel_dir.is_dir():
+            stipple_panel_dir.mkdir(parents=True, exist_ok=True)
+            
+            # reuse the SVG of the former per stipple layout (stipple_id/WxH/stipple.svg)
+            legacy_svg_path = self.cache_base_path / stipple.id / f"{panel_bitmap.width}x{panel_bitmap.height}" / STIPPLE_SVG_NAME
+            if is_complete_svg(legacy_svg_path):
+                shutil.copyfile(legacy_svg_path, stipple_panel_dir / STIPPLE_SVG_NAME)
+        return stipple_panel_dir
+    
     def _get_or_create_svg_for_bitmap(self, 
                                       bitmap: Bitmap,
                                       run_dir: Path) -> Path:
-        svg_path = run_dir / Path('stipple.svg')
+        svg_path = run_dir / STIPPLE_SVG_NAME
         
-        if not svg_path.exists() or not svg_path.is_file():  # load persisted SVG
-            bmp_path = run_dir / Path('stipple.pbm')
-            bmp_preproc_path = run_dir / Path('stipple_preprocessed.pbm')
-            bitmap.to_pbm(bmp_path)
-            BitmapVectorizer.convert_bitmap_to_svg(bmp_path, bmp_preproc_path, svg_path)
+        if not is_complete_svg(svg_path):  # otherwise load persisted SVG
+            BitmapVectorizer.convert_bitmap_data_to_svg(bitmap, svg_path)
             
         return svg_path
+
+    def _load_or_create_path_data(self,
+                                  svg_path: Path,
+                                  progress_reporter: Optional[ProgressReporter]) -> List[SvgPathData]:
+        """
+        The parsed path data is persisted next to the SVG,
+        it is only valid as long as the SHA-256 of the SVG content matches
+        """
+        pickle_path = svg_path.with_name(STIPPLE_PATH_DATA_NAME)
+        
+        # NOTE: the memory mapped SVG is hashed and (on a miss) parsed in place,
+        #       instead of reading the file into memory for each of them
+        with open(svg_path, 'rb') as svg_file:
+            # NOTE: an empty file can't be memory mapped,
+            #       the next export vectorizes the panel again (see is_complete_svg)
+            if os.fstat(svg_file.fileno()).st_size == 0:
+                raise ValueError(f"ERROR: stipple SVG {svg_path} is empty, potrace did not complete")
+            svg_map = mmap.mmap(svg_file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        with svg_map:
+            svg_digest = hashlib.sha256(svg_map).hexdigest()
+            
+            path_data = self._load_persisted_path_data(pickle_path, svg_digest)
+            if path_data is not None:
+                return path_data
+            
+            path_data = parse_svg_path_data(svg_path, progress_reporter, svg_file=svg_map)
+        
+        # NOTE: write to a temporary file first, so a canceled or concurrent
+        #       export never leaves a truncated pickle behind
+        tmp_path = pickle_path.with_name(f"{pickle_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((PATH_DATA_CACHE_VERSION, svg_digest, path_data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, pickle_path)
+        
+        return path_data
     
+    def _load_persisted_path_data(self, pickle_path: Path, svg_digest: str) -> Optional[List[SvgPathData]]:
+        try:
+            with open(pickle_path, 'rb') as f:
+                version, digest, path_data = pickle.load(f)
+            if version == PATH_DATA_CACHE_VERSION and digest == svg_digest:
+                return path_data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            if Debugging.DEBUG:
+                debug(f"StippleCache: ignoring unreadable path data {pickle_path}: {e}")
+        return None
@@ -16,11 +16,14 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 #-----------------
 
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate
+import io
 from pathlib import Path
 import re
 from typing import *
 import unittest
-import xml.etree.ElementTree as ET
 
 import pya
 
@@ -31,6 +34,24 @@ from progress_reporter import ProgressReporter
 
 
 _transform_re = re.compile(r"(\w+)\(([^)]*)\)")
+_transform_args_sep_re = re.compile(r"[ ,]+")
+
+# the transform potrace puts on the <g> wrapping all paths
+_potrace_transform_re = re.compile(r"\s*translate\(([-+.\d]+),([-+.\d]+)\)\s*scale\(([-+.\d]+),([-+.\d]+)\)\s*")
+
+# one SVG path command letter, followed by its (possibly repeated) arguments
+_path_command_re = re.compile(r"([MmLlCcZz])([^MmLlCcZz]*)")
+_path_number_re = re.compile(r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?")
+
+# command sequences of SvgPathData, which are made up of polygon subpaths only
+_polygon_subpath_re = re.compile(r"ML*Z?")
+_polygon_commands_re = re.compile(r"(?:ML*Z?)*")
+
+
+# (m11, m12, m21, m22, dx, dy) of an affine QTransform
+AffineMatrix = Tuple[float, float, float, float, float, float]
+
+IDENTITY_MATRIX: AffineMatrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
 
 
 def parse_svg_transform(transform: str) -> pya.QTransform:
@@ -38,22 +59,39 @@ def parse_svg_transform(transform: str) -> pya.QTransform:
     Parse a subset of SVG transform strings into a QTransform.
     Supports: translate, scale
     """
-    t = pya.QTransform()
+    return pya.QTransform(*parse_svg_transform_matrix(transform))
+
 
+# NOTE: potrace repeats the same transform attribute in every SVG
+#       pure Python, the SVGs are also parsed in the vectorizer worker threads,
+#       where pya must not be used
+@lru_cache(maxsize=1024)
+def parse_svg_transform_matrix(transform: str) -> AffineMatrix:
+    """
+    Parse a subset of SVG transform strings into an affine matrix.
+    Supports: translate, scale
+    """
+    m = _potrace_transform_re.fullmatch(transform)
+    if m:
+        tx, ty, sx, sy = map(float, m.groups())
+        return (sx, 0.0, 0.0, sy, tx, ty)
+    
+    # NOTE: like QTransform.translate()/scale(), each operation is applied before the previous ones
+    t = IDENTITY_MATRIX
     for name, args in _transform_re.findall(transform):
-        values = [float(v) for v in re.split(r"[ ,]+", args.strip()) if v]
+        values = [float(v) for v in _transform_args_sep_re.split(args.strip()) if v]
 
         if name == "translate":
             if len(values) == 1:
-                t.translate(values[0], 0.0)
+                t = compose_matrices((1.0, 0.0, 0.0, 1.0, values[0], 0.0), t)
             elif len(values) >= 2:
-                t.translate(values[0], values[1])
+                t = compose_matrices((1.0, 0.0, 0.0, 1.0, values[0], values[1]), t)
 
         elif name == "scale":
             if len(values) == 1:
-                t.scale(values[0], values[0])
+                t = compose_matrices((values[0], 0.0, 0.0, values[0], 0.0, 0.0), t)
             elif len(values) >= 2:
-                t.scale(values[0], values[1])
+                t = compose_matrices((values[0], 0.0, 0.0, values[1], 0.0, 0.0), t)
 
         else:
             raise ValueError(f"Unsupported SVG transform: {name}")
@@ -61,111 +99,261 @@ def parse_svg_transform(transform: str) -> pya.QTransform:
     return t
 
 
-def convert_svg_to_qpainter_paths(svg_path: Path,
-                                  progress_reporter: Optional[ProgressReporter]) -> List[pya.QPainterPath]:
-    if Debugging.DEBUG:
-        debug(f"convert_svg_to_qpainter_paths: begin parsing SVG file {svg_path}")
+def compose_matrices(a: AffineMatrix, b: AffineMatrix) -> AffineMatrix:
+    """
+    Same as QTransform(*a) * QTransform(*b), without allocating any QTransform
+    """
+    a11, a12, a21, a22, adx, ady = a
+    b11, b12, b21, b22, bdx, bdy = b
+    return (a11 * b11 + a12 * b21,
+            a11 * b12 + a12 * b22,
+            a21 * b11 + a22 * b21,
+            a21 * b12 + a22 * b22,
+            adx * b11 + ady * b21 + bdx,
+            adx * b12 + ady * b22 + bdy)
+
+
+@dataclass
+class SvgPathData:
+    """
+    Plain data of a single SVG <path>, independent of Qt (i.e. it can be pickled)
+
+    - commands: one absolute command letter (M, L, C or Z) per segment
+    - coordinates: flattened x/y pairs of the segments,
+                   the composed SVG transform is already applied
+    """
+    commands: str
+    coordinates: Sequence[float]
     
-    tree = ET.parse(str(svg_path))
-    root = tree.getroot()
+    def to_qpainter_path(self) -> pya.QPainterPath:
+        path = pya.QPainterPath()
+        
+        # NOTE: with alphamax 0, potrace emits polygons only (M, L, Z),
+        #       hand over each subpath at once instead of one lineTo per point
+        if _polygon_commands_re.fullmatch(self.commands):
+            QPointF = pya.QPointF
+            c = self.coordinates
+            points = [QPointF(x, y) for x, y in zip(c[0::2], c[1::2])]
+            i = 0
+            for m in _polygon_subpath_re.finditer(self.commands):
+                subpath = m.group()
+                closed = subpath[-1] == "Z"
+                n = len(subpath) - 1 if closed else len(subpath)
+                path.addPolygon(pya.QPolygonF(points[i:i+n]))
+                if closed:
+                    path.closeSubpath()
+                i += n
+            return path
+        
+        move_to = path.moveTo
+        line_to = path.lineTo
+        cubic_to = path.cubicTo
+        c = self.coordinates
+        i = 0
+        
+        # NOTE: hot-spot, the (x, y) overloads avoid allocating a QPointF per point
+        for cmd in self.commands:
+            if cmd == "M":
+                move_to(c[i], c[i+1])
+                i += 2
+            elif cmd == "L":
+                line_to(c[i], c[i+1])
+                i += 2
+            elif cmd == "C":
+                cubic_to(c[i], c[i+1], c[i+2], c[i+3], c[i+4], c[i+5])
+                i += 6
+            else:  # Z
+                path.closeSubpath()
+        
+        return path
+
+
+@lru_cache(maxsize=None)
+def _xml_iterparse() -> Callable:
+    """
+    The XML parser is only imported when the first stipple SVG is parsed,
+    not when the plugin is loaded.
     
+    NOTE: lxml is used when installed, its iterparse is API compatible
+          with the stdlib one used as fallback
+    """
+    try:
+        from lxml.etree import iterparse
+    except ImportError:
+        from xml.etree.ElementTree import iterparse
+    return iterparse
+
+
+def parse_svg_path_data(svg_path: Path,
+                        progress_reporter: Optional[ProgressReporter],
+                        svg_file: Optional[BinaryIO] = None) -> List[SvgPathData]:
+    """
+    Parse the paths of the SVG file svg_path,
+    or of svg_file (an already opened or memory mapped file of it) if given
+    """
     if Debugging.DEBUG:
-        debug(f"convert_svg_to_qpainter_paths: end parsing SVG file {svg_path}")
+        debug(f"parse_svg_path_data: begin parsing SVG file {svg_path}")
     
-    if Debugging.DEBUG:
-        debug(f"convert_svg_to_qpainter_paths: begin QPainterPath object creation")
+    path_data: List[SvgPathData] = []
+    was_canceled = progress_reporter.was_canceled if progress_reporter is not None else None
+    
+    def create_path_data(d: str, transform: AffineMatrix) -> SvgPathData:
+        commands: List[str] = []
+        coordinates: List[float] = []
+        
+        # NOTE: the current and subpath start points are resolved as plain floats,
+        #       relative commands are converted into absolute ones
+        cx = cy = 0.0
+        sx = sy = 0.0
+        
+        # NOTE: hot-spot, the regex engine splits the path data into commands
+        #       and their argument runs, which are then resolved with C level
+        #       slicing and accumulate, so there is no per-token Python dispatch
+        for cmd, args in _path_command_re.findall(d):
+            if cmd in ("Z", "z"):
+                commands.append("Z")
+                cx, cy = sx, sy
+                continue
+            
+            values = list(map(float, _path_number_re.findall(args)))
+            
+            # coordinate pairs per segment, M/m and L/l: 1, C/c: 3 (2 control points + end point)
+            pairs = 3 if cmd in ("C", "c") else 1
+            stride = 2 * pairs
+            n = len(values) // stride
+            if n == 0:
+                continue
+            del values[n * stride:]  # incomplete trailing arguments are ignored
+            
+            if cmd.islower():
+                # NOTE: the end points are the running sums of the relative ones,
+                #       all points of a segment are relative to the previous end point
+                ex = list(accumulate(values[stride-2::stride], initial=cx))
+                ey = list(accumulate(values[stride-1::stride], initial=cy))
+                for k in range(0, stride, 2):
+                    values[k::stride] = [o + v for o, v in zip(ex, values[k::stride])]
+                    values[k+1::stride] = [o + v for o, v in zip(ey, values[k+1::stride])]
+            
+            cx = values[-2]
+            cy = values[-1]
+            
+            if cmd in ("M", "m"):
+                # further coordinate pairs are implicit lineto commands
+                commands.append("M")
+                commands.append("L" * (n - 1))
+                sx = values[0]
+                sy = values[1]
+            else:
+                commands.append(cmd.upper() * n)
+            coordinates += values
+        
+        # 🔑 apply composed SVG transform here,
+        #    once over all coordinates instead of mapping each QPainterPath
+        if transform != IDENTITY_MATRIX:
+            m11, m12, m21, m22, dx, dy = transform
+            xs = coordinates[0::2]
+            ys = coordinates[1::2]
+            coordinates[0::2] = [m11 * x + m21 * y + dx for x, y in zip(xs, ys)]
+            coordinates[1::2] = [m12 * x + m22 * y + dy for x, y in zip(xs, ys)]
+        
+        return SvgPathData("".join(commands), coordinates)
     
-    paths: List[pya.QPainterPath] = []
+    # NOTE: stream the SVG instead of building the whole tree,
+    #       the composed transforms of the open elements are kept on a stack
+    transform_stack: List[AffineMatrix] = [IDENTITY_MATRIX]
     
-    token_re = re.compile(r"[MmLlCcZz]|-?\d+(?:\.\d+)?")
+    for event, elem in _xml_iterparse()(svg_file if svg_file is not None else str(svg_path), events=("start", "end")):
+        if event == "start":
+            # Update transform if this node has one
+            transform = transform_stack[-1]
+            transform_attr = elem.attrib.get("transform")
+            if transform_attr:
+                local = parse_svg_transform_matrix(transform_attr)
+                transform = compose_matrices(transform, local)
+            transform_stack.append(transform)
+        
+            # Process <path> elements
+            if elem.tag.endswith("path"):
+                # NOTE: only poll for cancellation every 64 paths,
+                #       instead of once per path command
+                if was_canceled is not None\
+                   and (len(path_data) & 63) == 0\
+                   and was_canceled():
+                   raise ExportCancelledError()
+                
+                path_data.append(create_path_data(elem.attrib.get("d", ""), transform))
+        else:
+            transform_stack.pop()
+            elem.clear()  # release the finished element
     
-    def walk(node, transform: pya.QTransform):
-        # Update transform if this node has one
-        local_transform = transform
-        transform_attr = node.attrib.get("transform")
-        if transform_attr:
-            local = parse_svg_transform(transform_attr)
-            local_transform = transform * local
+    if Debugging.DEBUG:
+        debug(f"parse_svg_path_data: end parsing SVG file {svg_path}")
     
-        # Process <path> elements
-        if node.tag.endswith("path"):
-            d = node.attrib.get("d", "")
-            tokens = token_re.findall(d)
+    return path_data
+
+
+def convert_svg_to_qpainter_paths(svg_path: Path,
+                                  progress_reporter: Optional[ProgressReporter]) -> List[pya.QPainterPath]:
+    return [pd.to_qpainter_path() for pd in parse_svg_path_data(svg_path, progress_reporter)]
+
+#--------------------------------------------------------------------------------
+
+class SvgPathDataParseTests(unittest.TestCase):
+    @staticmethod
+    def parse(*path_d: str, transform: Optional[str] = None) -> List[SvgPathData]:
+        paths = "".join(f'<path d="{d}"/>' for d in path_d)
+        if transform is not None:
+            paths = f'<g transform="{transform}">{paths}</g>'
+        svg_xml = f'<svg xmlns="http://www.w3.org/2000/svg">{paths}</svg>'
+        return parse_svg_path_data(Path("test.svg"), progress_reporter=None,
+                                   svg_file=io.BytesIO(svg_xml.encode()))
     
-            path = pya.QPainterPath()
-            cur = pya.QPointF(0.0, 0.0)
-            start = pya.QPointF(0.0, 0.0)
+    def assertPathData(self,
+                       path_data: SvgPathData,
+                       commands: str,
+                       coordinates: List[float]):
+        self.assertEqual(commands, path_data.commands)
+        self.assertEqual(len(coordinates), len(path_data.coordinates))
+        for expected, actual in zip(coordinates, path_data.coordinates):
+            self.assertAlmostEqual(expected, actual)
     
-            i = 0
-            cmd = None
+    def test_relative_lineto_and_curveto_runs(self):
+        # the control points of c are relative to the previous end point as well
+        [pd] = self.parse("M 10 20 l 5 0 0 5 c 1 1 2 2 3 3 1 0 1 0 1 0 z")
+        self.assertPathData(pd, "MLLCCZ",
+                            [10, 20,  15, 20,  15, 25,
+                             16, 26,  17, 27,  18, 28,
+                             19, 28,  19, 28,  19, 28])
     
-            while i < len(tokens):
-                if progress_reporter is not None\
-                   and progress_reporter.was_canceled():
-                   raise ExportCancelledError()
-            
-                t = tokens[i]
-    
-                if re.match(r"[MmLlCcZz]", t):
-                    cmd = t
-                    i += 1
-    
-                if cmd in ("M", "m"):
-                    x = float(tokens[i]); y = float(tokens[i+1])
-                    i += 2
-                    if cmd == "m":
-                        cur += pya.QPointF(x, y)
-                    else:
-                        cur = pya.QPointF(x, y)
-                    path.moveTo(cur)
-                    start = pya.QPointF(cur.x, cur.y)
-                    cmd = "L" if cmd == "M" else "l"
-    
-                elif cmd in ("L", "l"):
-                    x = float(tokens[i]); y = float(tokens[i+1])
-                    i += 2
-                    if cmd == "l":
-                        cur += pya.QPointF(x, y)
-                    else:
-                        cur = pya.QPointF(x, y)
-                    path.lineTo(cur)
-    
-                elif cmd in ("C", "c"):
-                    x1 = float(tokens[i]);   y1 = float(tokens[i+1])
-                    x2 = float(tokens[i+2]); y2 = float(tokens[i+3])
-                    x3 = float(tokens[i+4]); y3 = float(tokens[i+5])
-                    i += 6
-    
-                    if cmd == "c":
-                        p1 = cur + pya.QPointF(x1, y1)
-                        p2 = cur + pya.QPointF(x2, y2)
-                        cur += pya.QPointF(x3, y3)
-                    else:
-                        p1 = pya.QPointF(x1, y1)
-                        p2 = pya.QPointF(x2, y2)
-                        cur = pya.QPointF(x3, y3)
-    
-                    path.cubicTo(p1, p2, cur)
-    
-                elif cmd in ("Z", "z"):
-                    path.closeSubpath()
-                    cur = pya.QPointF(start.x, start.y)
+    def test_multiple_subpaths(self):
+        # after z, the relative m starts at the start point of the closed subpath
+        [pd] = self.parse("M1 1L2 1L2 2zm2 2l1 0z")
+        self.assertPathData(pd, "MLLZMLZ", [1, 1,  2, 1,  2, 2,  3, 3,  4, 3])
     
-            # 🔑 apply composed SVG transform here
-            path = local_transform.map(path)
-            paths.append(path)
+    def test_implicit_lineto_after_moveto(self):
+        pd_abs, pd_rel = self.parse("M0 0 1 0 1 1Z", "m1 1 2 0 0 2z")
+        self.assertPathData(pd_abs, "MLLZ", [0, 0,  1, 0,  1, 1])
+        self.assertPathData(pd_rel, "MLLZ", [1, 1,  3, 1,  3, 3])
     
-        for child in node:
-            walk(child, local_transform)
+    def test_exponent_numbers(self):
+        [pd] = self.parse("M1e1-2.5E-1L.5e+1,3")
+        self.assertPathData(pd, "ML", [10, -0.25,  5, 3])
     
-    walk(root, pya.QTransform())
+    def test_incomplete_trailing_arguments_ignored(self):
+        [pd] = self.parse("M0 0L1 2 3")
+        self.assertPathData(pd, "ML", [0, 0,  1, 2])
     
-    if Debugging.DEBUG:
-        debug(f"convert_svg_to_qpainter_paths: end QPainterPath object creation")
+    def test_group_transform_applied(self):
+        # potrace style: flip y around the figure height, scale down by 10
+        [pd] = self.parse("M10 20l20 20", transform="translate(0.000000,16.000000) scale(0.100000,-0.100000)")
+        self.assertPathData(pd, "ML", [1, 14,  3, 12])
     
-    return paths
-
-#--------------------------------------------------------------------------------
+    def test_transform_matrix_in_qtransform_order(self):
+        # each operation is applied before the previous ones, like QTransform.translate()/scale()
+        self.assertEqual((0.1, 0.0, 0.0, -0.1, 0.0, 16.0),
+                         parse_svg_transform_matrix("translate(0.000000,16.000000) scale(0.100000,-0.100000)"))
+        self.assertEqual((3.0, 0.0, 0.0, 4.0, 16.0, 2.0),
+                         parse_svg_transform_matrix("translate(1, 2) scale(3 4) translate(5)"))
 
 class BitmapVectorizerPdfRenderTests(unittest.TestCase):
     def test_render_svg_paths_to_pdf(self):
@@ -193,7 +381,7 @@ fill="#000000" stroke="none">
         
         try:
             # Convert SVG paths
-            paths = convert_svg_to_qpainter_paths(svg_path)
+            paths = convert_svg_to_qpainter_paths(svg_path, progress_reporter=None)
             self.assertGreater(len(paths), 0, "No paths extracted from SVG")
             
             # Create PDF writer
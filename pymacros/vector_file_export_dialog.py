@@ -18,10 +18,14 @@
 
 import pya
 
+from contextlib import contextmanager
+import dataclasses
+from functools import lru_cache
 import os
 from pathlib import Path
-import shutil
+import time
 import traceback
+from typing import *
 
 from klayout_plugin_utils.debugging import debug, Debugging
 from klayout_plugin_utils.file_system_helpers import FileSystemHelpers
@@ -29,10 +33,10 @@ from klayout_plugin_utils.lru_file_helper import LRUFileHelper
 from klayout_plugin_utils.qt_helpers import qmessagebox_critical
 
 from design_info import DesignInfo
+from exception import ExportCancelledError
 from previous_ui_settings import PreviousUISettings
 from progress_reporter import ProgressReporter
 from vector_file_export_settings import *
-from vector_file_exporter import VectorFileExporter, ExportCancelledError
 
 
 path_containing_this_script = os.path.realpath(os.path.dirname(__file__))
@@ -40,26 +44,159 @@ path_containing_this_script = os.path.realpath(os.path.dirname(__file__))
 # Config key used to persist the runset LRU list for this specific plugin.
 _RUNSET_LRU_CONFIG_KEY = "vector_file_export.lru_runsets"
 
+# file format combo box text -> (file format, layer output style)
+_FILE_FORMAT_CHOICES: Dict[str, Tuple[VectorFileFormat, LayerOutputStyle]] = {
+    'SVG': (VectorFileFormat.SVG, LayerOutputStyle.SINGLE_PAGE),
+    'PDF (single page)': (VectorFileFormat.PDF, LayerOutputStyle.SINGLE_PAGE),
+    'PDF (page per layer)': (VectorFileFormat.PDF, LayerOutputStyle.PAGE_PER_LAYER),
+}
+_FILE_FORMAT_CHOICE_TITLES: Dict[Tuple[VectorFileFormat, LayerOutputStyle], str] = {
+    combo: title for title, combo in _FILE_FORMAT_CHOICES.items()
+}
+
+# file format -> (save file dialog filter, suffix)
+_FILE_FORMAT_FILTERS: Dict[VectorFileFormat, Tuple[str, str]] = {
+    VectorFileFormat.PDF: ('PDF (*.pdf)', '.pdf'),
+    VectorFileFormat.SVG: ('SVG (*.svg)', '.svg'),
+}
+
+# setting -> (name of the radio button to check, name of the radio button to uncheck)
+_PAGE_ORIENTATION_RADIO_BUTTONS: Dict[PageOrientation, Tuple[str, str]] = {
+    PageOrientation.PORTRAIT: ('portrait_rb', 'landscape_rb'),
+    PageOrientation.LANDSCAPE: ('landscape_rb', 'portrait_rb'),
+}
+_CONTENT_SCALING_RADIO_BUTTONS: Dict[ContentScaling, Tuple[str, str]] = {
+    ContentScaling.FIGURE_WIDTH_MM: ('figure_size_rb', 'scaling_rb'),
+    ContentScaling.SCALING: ('scaling_rb', 'figure_size_rb'),
+}
+_FONT_SIZE_MODE_RADIO_BUTTONS: Dict[FontSizeMode, Tuple[str, str]] = {
+    FontSizeMode.ABSOLUTE: ('font_size_absolute_rb', 'font_size_relative_rb'),
+    FontSizeMode.PERCENT_OF_FIG_WIDTH: ('font_size_relative_rb', 'font_size_absolute_rb'),
+}
+
+
+@contextmanager
+def signals_blocked(*widgets: pya.QObject):
+    """
+    Block the signals of the given widgets, their previous state is restored on exit
+    (also if an exception is raised)
+    """
+    previously_blocked = [w.blockSignals(True) for w in widgets]
+    try:
+        yield
+    finally:
+        for w, blocked in zip(widgets, previously_blocked):
+            w.blockSignals(blocked)
+
+
+@contextmanager
+def updates_disabled(*widgets: pya.QWidget):
+    """
+    Disable the repaints of the given widgets, their previous state is restored on exit
+    (also if an exception is raised)
+    """
+    previously_enabled = [w.updatesEnabled for w in widgets]
+    for w in widgets:
+        w.setUpdatesEnabled(False)
+    try:
+        yield
+    finally:
+        for w, enabled in zip(widgets, previously_enabled):
+            w.setUpdatesEnabled(enabled)
+
+
+_found_executables: Dict[str, str] = {}
+
+
+def _which(name: str) -> Optional[str]:
+    """
+    shutil.which() scans every PATH directory, found executables are remembered for the session
+    (missing ones are not, so installing them doesn't require a restart of KLayout)
+    """
+    path = _found_executables.get(name)
+    if path is None:
+        import shutil
+        path = shutil.which(name)
+        if path is not None:
+            _found_executables[name] = path
+    return path
+
+
+@lru_cache(maxsize=None)
+def _ui_form_bytes() -> bytes:
+    # NOTE: the .ui form is read from disk only once per session
+    ui_path = os.path.join(path_containing_this_script, "VectorFileExportDialog.ui")
+    with open(ui_path, 'rb') as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def _page_size_items() -> List[Tuple[str, str]]:
+    """
+    (formatted title, QPageSize name) of all page sizes offered in the page format combo box,
+    this never changes during a session, so it is only computed once
+    """
+    items = []
+    for page_id in range(pya.QPageSize.A4.to_i(), pya.QPageSize.LastPageSize.to_i() + 1):
+        if page_id == pya.QPageSize.Custom.to_i():
+            continue
+        name = pya.QPageSize(pya.QPageSize_PageSizeId(page_id)).name()
+        formatted_title = VectorFileExportDialog.format_page_size(page_id)
+        items.append((formatted_title, name))
+    return items
+
+
+@lru_cache(maxsize=None)
+def _page_size_indexes() -> Dict[str, int]:
+    """
+    QPageSize name -> index in the page format combo box (which is filled from _page_size_items())
+    """
+    return {name: idx for idx, (_, name) in enumerate(_page_size_items())}
+
 
 class VectorFileExportDialog(pya.QDialog, ProgressReporter):
+    _ui_loader: Optional[pya.QUiLoader] = None
+    
+    # NOTE: minimum seconds between two progress dialog updates / event loop runs
+    PROGRESS_UPDATE_INTERVAL = 0.05
+    
+    # NOTE: upper bound in milliseconds for the event processing done per progress update
+    PROGRESS_EVENTS_MAX_TIME_MS = 5
+    
+    # NOTE: quiet time after the last spin box change, before the dependent fields are recomputed
+    RECOMPUTE_DEBOUNCE_MS = 200
+    
     def __init__(self, settings: VectorFileExportSettings, parent=None):
         super().__init__(parent)
         
         self.progress_dialog = None
+        self._canceled = False
+        self._exporting = False
+        
+        self._updating_ui = False
+        self._applied_settings: Optional[VectorFileExportSettings] = None
+        
+        # NOTE: the dialog is modal, so the current view can't change while it is open
+        self._layout_view = pya.LayoutView.current()
+        self._design_info: Optional[DesignInfo] = None
+        self._design_info_key: Optional[Tuple[ContentScaling, float]] = None
 
         # LRU helper – reusable; the config key is plugin-specific
         self._lru = LRUFileHelper(config_key=_RUNSET_LRU_CONFIG_KEY, max_entries=15)
         
         self.setWindowTitle('Vector File Export')
         
-        loader = pya.QUiLoader()
-        ui_path = os.path.join(path_containing_this_script, "VectorFileExportDialog.ui")
-        ui_file = pya.QFile(ui_path)
+        # NOTE: a single loader is shared by all dialog instances,
+        #       the form is loaded from the in-memory copy of the .ui file
+        if VectorFileExportDialog._ui_loader is None:
+            VectorFileExportDialog._ui_loader = pya.QUiLoader()
+        ui_buffer = pya.QBuffer()
+        ui_buffer.setData(_ui_form_bytes())
         try:
-            ui_file.open(pya.QFile.ReadOnly)
-            self.page = loader.load(ui_file, self)
+            ui_buffer.open(pya.QIODevice.ReadOnly)
+            self.page = VectorFileExportDialog._ui_loader.load(ui_buffer, self)
         finally:
-            ui_file.close()
+            ui_buffer.close()
 
         self.bottom = pya.QHBoxLayout()
         
@@ -103,38 +240,64 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
         self.loadButton.setAutoDefault(False)
         self.lruButton.setAutoDefault(False)
                 
-        self.page.page_format_cob.clear()
-        for page_id in range(pya.QPageSize.A4.to_i(), pya.QPageSize.LastPageSize.to_i() + 1):
-            if page_id == pya.QPageSize.Custom.to_i():
-                continue
-            name = pya.QPageSize(pya.QPageSize_PageSizeId(page_id)).name()
-            formatted_title = self.format_page_size(page_id)
-            self.page.page_format_cob.addItem(formatted_title, name)
-        
-        self.page.colors_cob.clear()
-        for mode in ColorMode:
-            self.page.colors_cob.addItem(mode.ui_label, mode.value)
-        
-        self.page.texts_cob.clear()
-        for mode in TextMode:
-            self.page.texts_cob.addItem(mode.ui_label, mode.value)
-        
-        self.page.layers_cob.clear()
-        for mode in LayerSelectionMode:
-            self.page.layers_cob.addItem(mode.ui_label, mode.value)
+        # NOTE: the combo boxes are filled in bulk, without intermediate repaints or signals
+        p = self.page
+        combo_boxes = (p.page_format_cob, p.colors_cob, p.texts_cob, p.layers_cob)
+        
+        # NOTE: the file format items come from the .ui form and never change
+        self._file_format_indexes: Dict[str, int] = {
+            p.file_format_cob.itemText(i): i for i in range(p.file_format_cob.count)
+        }
+        with signals_blocked(*combo_boxes), updates_disabled(*combo_boxes):
+            p.page_format_cob.clear()
+            for formatted_title, name in _page_size_items():
+                p.page_format_cob.addItem(formatted_title, name)
+            
+            p.colors_cob.clear()
+            for mode in ColorMode:
+                p.colors_cob.addItem(mode.ui_label, mode.value)
+            
+            p.texts_cob.clear()
+            for mode in TextMode:
+                p.texts_cob.addItem(mode.ui_label, mode.value)
+            
+            p.layers_cob.clear()
+            for mode in LayerSelectionMode:
+                p.layers_cob.addItem(mode.ui_label, mode.value)
         
         self.page.file_format_cob.currentIndexChanged.connect(self.on_file_format_changed)
         self.page.colors_cob.currentIndexChanged.connect(self.on_color_changed)
         self.page.browse_save_path_pb.clicked.connect(self.on_browse_save_path)
-        self.page.figure_width_sb.valueChanged.connect(self.on_figure_width_changed)
-        self.page.figure_height_sb.valueChanged.connect(self.on_figure_height_changed)
-        self.page.scaling_sb.valueChanged.connect(self.on_scaling_value_changed)
+        
+        # NOTE: spin box changes come in bursts (typing, holding an arrow key),
+        #       the dependent fields are only recomputed once the burst is over
+        self._pending_recompute: Optional[Callable[[], None]] = None
+        self._recompute_timer = pya.QTimer(self)
+        self._recompute_timer.setSingleShot(True)
+        self._recompute_timer.setInterval(self.RECOMPUTE_DEBOUNCE_MS)
+        self._recompute_timer.timeout.connect(self._run_pending_recompute)
+        
+        self.page.figure_width_sb.valueChanged.connect(lambda: self._schedule_recompute(self.on_figure_width_changed))
+        self.page.figure_height_sb.valueChanged.connect(lambda: self._schedule_recompute(self.on_figure_height_changed))
+        self.page.scaling_sb.valueChanged.connect(lambda: self._schedule_recompute(self.on_scaling_value_changed))
 
         # self.scene = pya.QGraphicsScene(self)
         # self.page.preview_gv.setScene(self.scene)        
         
         self.update_ui_from_settings(settings)
 
+    def _schedule_recompute(self, handler: Callable[[], None]):
+        # the latest edit wins, a pending recompute of another spin box is replaced
+        self._pending_recompute = handler
+        self._recompute_timer.start()
+    
+    def _run_pending_recompute(self):
+        self._recompute_timer.stop()
+        handler = self._pending_recompute
+        self._pending_recompute = None
+        if handler is not None:
+            handler()
+
     def _rebuild_lru_menu(self):
         """Populate (or refresh) the LRU popup menu."""
         self.lruMenu.clear()
@@ -171,12 +334,47 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
             traceback.print_exc()
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def format_page_size(page_size_id: int) -> str:
         page_size = pya.QPageSize(pya.QPageSize.PageSizeId(page_size_id))
         size_mm = page_size.size(pya.QPageSize.Millimeter)
         title = f"{page_size.name()} ({size_mm.width:.0f} x {size_mm.height:.0f} mm)"
         return title
 
+    def design_info_for_settings(self, settings: VectorFileExportSettings) -> DesignInfo:
+        """
+        NOTE: the dialog only reads the geometry and the scaling related fields of the DesignInfo,
+              so it is reused as long as the content scaling settings did not change
+              (the layout can't be edited while the modal dialog is open)
+        """
+        key = (settings.content_scaling_style, settings.content_scaling_value)
+        if self._design_info is None:
+            self._design_info = DesignInfo.for_layout_view(self._layout_view, settings)
+            self._design_info_key = key
+        elif self._design_info_key != key:
+            # the layout geometry is kept, only the derived scalars are recomputed
+            self._design_info = dataclasses.replace(self._design_info, settings=settings)
+            self._design_info_key = key
+        return self._design_info
+
+    def _content_scaling_settings_from_ui(self) -> VectorFileExportSettings:
+        """
+        NOTE: the spin box handlers only need the content scaling fields (see design_info_for_settings),
+              so only those are read from the widgets, on top of the last applied settings
+        """
+        if self._applied_settings is None:
+            return self.settings_from_ui()
+        
+        p = self.page
+        if p.figure_size_rb.checked:
+            return dataclasses.replace(self._applied_settings,
+                                       content_scaling_style=ContentScaling.FIGURE_WIDTH_MM,
+                                       content_scaling_value=p.figure_width_sb.value)
+        else:
+            return dataclasses.replace(self._applied_settings,
+                                       content_scaling_style=ContentScaling.SCALING,
+                                       content_scaling_value=p.scaling_sb.value)
+
     def on_reset(self):
         if Debugging.DEBUG:
             debug("VectorFileExportDialog.on_reset")
@@ -264,47 +462,87 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
             traceback.print_exc()
 
     def begin_progress(self, maximum: int):
-        self.progress_dialog = pya.QProgressDialog(
-            "Exporting shapes…",
-            "Cancel",
-            0,
-            maximum,
-            self
-        )
-        self.progress_dialog.setWindowTitle("Export")
-        self.progress_dialog.setWindowModality(pya.Qt.WindowModal)
-        self.progress_dialog.setMinimumDuration(0)
-        self.progress_dialog.setAutoClose(True)
-        self.progress_dialog.setAutoReset(True)
+        # NOTE: the progress dialog is created once and reused by later exports
+        if self.progress_dialog is None:
+            self.progress_dialog = pya.QProgressDialog(
+                "Exporting shapes…",
+                "Cancel",
+                0,
+                maximum,
+                self
+            )
+            self.progress_dialog.setWindowTitle("Export")
+            self.progress_dialog.setWindowModality(pya.Qt.WindowModal)
+            self.progress_dialog.setMinimumDuration(0)
+            self.progress_dialog.setAutoClose(True)
+            self.progress_dialog.setAutoReset(True)
+            
+            # NOTE: the exporter polls was_canceled() per shape,
+            #       so the canceled signal sets a plain flag instead of querying the dialog each time
+            self.progress_dialog.canceled.connect(self._on_progress_canceled)
+        else:
+            self.progress_dialog.reset()
+            self.progress_dialog.setMaximum(maximum)
+            self.progress_dialog.setLabelText("Exporting shapes…")
+        
+        self._last_progress_update = 0.0
+        self._last_exported_layers = -1
+        self._canceled = False
 
     def progress(self, data: Dict[str, Any]):
         total_layers = data['total_layers']
         exported_layers = data['exported_layers']
+        if exported_layers == self._last_exported_layers:
+            return
+        
+        # NOTE: on layouts with many layers, updating the dialog and processing the events
+        #       per layer would dominate, the final update is never skipped
+        now = time.monotonic()
+        if exported_layers < total_layers\
+           and now - self._last_progress_update < self.PROGRESS_UPDATE_INTERVAL:
+            return
+        self._last_progress_update = now
+        self._last_exported_layers = exported_layers
+        
         self.progress_dialog.setValue(exported_layers)
         self.progress_dialog.setLabelText(f"Exported {exported_layers} / {total_layers} layers")
-        pya.QApplication.processEvents()
+        pya.QApplication.processEvents(pya.QEventLoop.AllEvents, self.PROGRESS_EVENTS_MAX_TIME_MS)
         
+    def _on_progress_canceled(self):
+        self._canceled = True
+    
     def was_canceled(self) -> bool:
-        return self.progress_dialog.wasCanceled
+        return self._canceled
         
     def on_export(self):
         if Debugging.DEBUG:
             debug("VectorFileExportDialog.on_export")
-
+        
+        # NOTE: the export processes events for the progress dialog,
+        #       a second click must not start another export meanwhile
+        if self._exporting:
+            return
+        self._exporting = True
+        
         self.exportButton.setEnabled(False)
+        self.cancelButton.setEnabled(False)
         
         try:
+            # NOTE: the exporter (and the stipple / SVG machinery it pulls in)
+            #       is only imported once an export is started, not when the plugin is loaded
+            from vector_file_exporter import VectorFileExporter
+            
             settings = self.settings_from_ui()
         
-            exporter = VectorFileExporter(layout_view=pya.LayoutView.current(),
+            exporter = VectorFileExporter(layout_view=self._layout_view,
                                           settings=settings,
                                           progress_reporter=self)
             
             if settings.include_stipples:
                 notfound = []
-                if not shutil.which('potrace'):
+                if not _which('potrace'):
                     notfound += ['potrace']
-                if not shutil.which('mkbitmap'):
+                if not _which('mkbitmap'):
                     notfound += ['mkbitmap']
                 if notfound:
                     raise Exception(f"Executable{'s' if len(notfound) >= 2 else ''} {' / '.join(notfound)}"
@@ -325,8 +563,10 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
                                  f"Caught exception: <pre>{e}</pre>")
         finally:
             if self.progress_dialog is not None:
-                self.progress_dialog.close()
-            self.exportButton.setEnabled(True)        
+                self.progress_dialog.hide()
+            self.exportButton.setEnabled(True)
+            self.cancelButton.setEnabled(True)
+            self._exporting = False
 
     def on_cancel(self):
         if Debugging.DEBUG:
@@ -334,68 +574,63 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
         self.reject()
     
     def settings_from_ui(self) -> VectorFileExportSettings:
-        file_format: VectorFileFormat
-        layer_output_style: LayerOutputStyle
-        
-        chosen_format = self.page.file_format_cob.currentText
-        if chosen_format == 'SVG':
-            file_format = VectorFileFormat.SVG
-            layer_output_style = LayerOutputStyle.SINGLE_PAGE
-        elif chosen_format == 'PDF (single page)':
-            file_format = VectorFileFormat.PDF
-            layer_output_style = LayerOutputStyle.SINGLE_PAGE
-        elif chosen_format == 'PDF (page per layer)':
-            file_format = VectorFileFormat.PDF
-            layer_output_style = LayerOutputStyle.PAGE_PER_LAYER
-        
-        output_path = Path(self.page.save_path_le.text)
-        title = self.page.title_le.text
-        page_format = self.page.page_format_cob.currentData()
+        # apply a still debounced spin box change first, so the settings are consistent
+        self._run_pending_recompute()
+        return self._read_settings_from_ui()
+    
+    def _read_settings_from_ui(self) -> VectorFileExportSettings:
+        # NOTE: called from most handlers, resolve the page widget only once
+        p = self.page
+        
+        chosen_format = p.file_format_cob.currentText
+        file_format, layer_output_style = _FILE_FORMAT_CHOICES[chosen_format]
+        
+        output_path = Path(p.save_path_le.text)
+        title = p.title_le.text
+        page_format = p.page_format_cob.currentData()
 
         page_orientation: PageOrientation
-        if self.page.portrait_rb.checked:
+        if p.portrait_rb.checked:
             page_orientation = PageOrientation.PORTRAIT
         else:
             page_orientation = PageOrientation.LANDSCAPE
         
         content_scaling_style: ContentScaling
         content_scaling_value: float
-        if self.page.figure_size_rb.checked:
+        if p.figure_size_rb.checked:
             content_scaling_style = ContentScaling.FIGURE_WIDTH_MM
-            content_scaling_value = self.page.figure_width_sb.value
+            content_scaling_value = p.figure_width_sb.value
         else:
             content_scaling_style = ContentScaling.SCALING
-            content_scaling_value = self.page.scaling_sb.value
+            content_scaling_value = p.scaling_sb.value
 
-        chosen_color_mode = self.page.colors_cob.currentData()
+        chosen_color_mode = p.colors_cob.currentData()
         color_mode: ColorMode = ColorMode(chosen_color_mode)
                 
-        include_background_color = self.page.include_bg_color_cb.checked
-        include_stipples = self.page.include_stipples_cb.checked
+        include_background_color = p.include_bg_color_cb.checked
+        include_stipples = p.include_stipples_cb.checked
         
-        font_family = self.page.font_family_cob.currentText
+        font_family = p.font_family_cob.currentText
         
         font_size_mode: FontSizeMode
-        if self.page.font_size_absolute_rb.checked:
+        if p.font_size_absolute_rb.checked:
             font_size_mode = FontSizeMode.ABSOLUTE
-        elif self.page.font_size_relative_rb.checked:
-            font_size_mode = FontSizeMode.PERCENT_OF_FIG_WIDTH
-        else:
+        else:  # relative radio button (also the fallback)
             font_size_mode = FontSizeMode.PERCENT_OF_FIG_WIDTH
         
-        font_size_pt = self.page.font_size_pt_sb.value
-        font_size_percent_of_fig_width = self.page.font_size_relative_sb.value
+        font_size_pt = p.font_size_pt_sb.value
+        font_size_percent_of_fig_width = p.font_size_relative_sb.value
         
-        chosen_text_mode = self.page.texts_cob.currentData()
+        chosen_text_mode = p.texts_cob.currentData()
         text_mode: TextMode = TextMode(chosen_text_mode)
         
-        text_layers_filter_enabled = self.page.text_layers_filter_enabled_cb.checked
-        text_layers = self.page.text_layers_filter_le.text
+        text_layers_filter_enabled = p.text_layers_filter_enabled_cb.checked
+        text_layers = p.text_layers_filter_le.text
 
-        chosen_layer_mode = self.page.layers_cob.currentData()
+        chosen_layer_mode = p.layers_cob.currentData()
         layer_selection_mode: LayerSelectionMode = LayerSelectionMode(chosen_layer_mode)
 
-        custom_layers = self.page.custom_layers_le.text.strip()
+        custom_layers = p.custom_layers_le.text.strip()
         
         return VectorFileExportSettings(
             file_format=file_format,
@@ -423,19 +658,40 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
     def update_ui_from_settings(self, settings: VectorFileExportSettings):
         if Debugging.DEBUG:
             debug("VectorFileExportDialog.update_ui_from_settings")
+        
+        # NOTE: nothing to do if the same settings were applied before and the widgets still show them
+        #       (the derived fields like the figure height are kept in sync by the handlers meanwhile)
+        if self._applied_settings is not None\
+           and self._pending_recompute is None\
+           and settings == self._applied_settings\
+           and settings == self._read_settings_from_ui():
+            return
+        
+        # NOTE: only the widgets with connected handlers need to be blocked,
+        #       blocking all descendants would also mute the signals Qt uses internally
+        #       (e.g. between a spin box and its line edit)
+        p = self.page
+        with signals_blocked(p.file_format_cob,
+                             p.browse_save_path_pb,
+                             p.colors_cob,
+                             p.figure_width_sb,
+                             p.figure_height_sb,
+                             p.scaling_sb,
+                             p.custom_layers_le):
+            # a still debounced spin box change would overwrite the new values afterwards
+            self._recompute_timer.stop()
+            self._pending_recompute = None
             
-        def block_signals(blocked: bool):
-            self.page.file_format_cob.blockSignals(blocked)
-            self.page.browse_save_path_pb.blockSignals(blocked)
-            self.page.colors_cob.blockSignals(blocked)
-            self.page.figure_width_sb.blockSignals(blocked)
-            self.page.figure_height_sb.blockSignals(blocked)
-            self.page.scaling_sb.blockSignals(blocked)
-            self.page.custom_layers_le.blockSignals(blocked)
-            
-        block_signals(True)
-        self._update_ui_from_settings(settings)
-        block_signals(False)
+            self._updating_ui = True
+            try:
+                self._update_ui_from_settings(settings)
+                self._applied_settings = dataclasses.replace(settings)
+            finally:
+                self._updating_ui = False
+    
+    def _check_radio_buttons(self, checked_name: str, unchecked_name: str):
+        getattr(self.page, checked_name).setChecked(True)
+        getattr(self.page, unchecked_name).setChecked(False)
     
     # NOTE: this method is guarded (all signals should be blocked)
     def _update_ui_from_settings(self, settings: VectorFileExportSettings):
@@ -443,16 +699,12 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
             debug("VectorFileExportDialog._update_ui_from_settings")
         
         format_combo = (settings.file_format, settings.layer_output_style)
-        format_choice = ''
-        if format_combo == (VectorFileFormat.PDF, LayerOutputStyle.SINGLE_PAGE):
-            format_choice = 'PDF (single page)'
-        elif format_combo == (VectorFileFormat.PDF, LayerOutputStyle.PAGE_PER_LAYER):
-            format_choice = 'PDF (page per layer)'
-        elif settings.file_format == VectorFileFormat.SVG:
-            format_choice = 'SVG'
-        else:
+        if settings.file_format == VectorFileFormat.SVG:
+            format_combo = (VectorFileFormat.SVG, LayerOutputStyle.SINGLE_PAGE)  # SVG is always a single page
+        format_choice = _FILE_FORMAT_CHOICE_TITLES.get(format_combo)
+        if format_choice is None:
             raise NotImplementedError(f"Unhandled enum case {(settings.file_format, settings.layer_output_style)}")
-        idx = self.page.file_format_cob.findText(format_choice)
+        idx = self._file_format_indexes.get(format_choice, -1)
         if idx >= 0:
             self.page.file_format_cob.setCurrentIndex(idx)
 
@@ -461,29 +713,24 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
         self.page.title_le.setText(settings.title)
         
         # NOTE: the file format combo box title additionally includes the dimensions in the text
-        #       but the QPageSize name does not, so we need to look at the currentData()
-        idx = self.page.page_format_cob.findData(settings.page_format)
+        #       but the QPageSize name does not, so we need to look at the item data
+        #       (looked up in a precomputed table instead of a linear findData() scan)
+        idx = _page_size_indexes().get(settings.page_format, -1)
         if idx >= 0:
             self.page.page_format_cob.setCurrentIndex(idx)
         
-        if settings.page_orientation == PageOrientation.PORTRAIT:
-            self.page.portrait_rb.setChecked(True)
-            self.page.landscape_rb.setChecked(False)
-        elif settings.page_orientation == PageOrientation.LANDSCAPE:
-            self.page.portrait_rb.setChecked(False)
-            self.page.landscape_rb.setChecked(True)
+        radio_buttons = _PAGE_ORIENTATION_RADIO_BUTTONS.get(settings.page_orientation)
+        if radio_buttons is not None:
+            self._check_radio_buttons(*radio_buttons)
         
-        design_info = DesignInfo.for_layout_view(pya.LayoutView.current(), settings)
-        
-        if settings.content_scaling_style == ContentScaling.FIGURE_WIDTH_MM:
-            self.page.figure_size_rb.setChecked(True)
-            self.page.scaling_rb.setChecked(False)
-        elif settings.content_scaling_style == ContentScaling.SCALING:
-            self.page.figure_size_rb.setChecked(False)
-            self.page.scaling_rb.setChecked(True)
-        else:
+        radio_buttons = _CONTENT_SCALING_RADIO_BUTTONS.get(settings.content_scaling_style)
+        if radio_buttons is None:
             raise NotImplementedError(f"Unhandled enum case {settings.content_scaling_style}")
+        self._check_radio_buttons(*radio_buttons)
         
+        # NOTE: only the figure size / scaling fields and the bounding box label depend on the DesignInfo,
+        #       which is memoized per content scaling setting (see design_info_for_settings)
+        design_info = self.design_info_for_settings(settings)
         self.page.figure_width_sb.setValue(design_info.fig_width_mm)
         self.page.figure_height_sb.setValue(design_info.fig_height_mm)
         self.page.scaling_sb.setValue(design_info.scaling)
@@ -494,12 +741,10 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
         
         self.page.font_family_cob.setCurrentText(settings.font_family)
 
-        if settings.font_size_mode == FontSizeMode.ABSOLUTE:
-            self.page.font_size_absolute_rb.setChecked(True)
-        elif settings.font_size_mode == FontSizeMode.PERCENT_OF_FIG_WIDTH:
-            self.page.font_size_relative_rb.setChecked(True)
-        else:
+        radio_buttons = _FONT_SIZE_MODE_RADIO_BUTTONS.get(settings.font_size_mode)
+        if radio_buttons is None:
             raise NotImplementedError(f"Unhandled enum case {settings.font_size_mode}")
+        self._check_radio_buttons(*radio_buttons)
         
         self.page.font_size_pt_sb.setValue(settings.font_size_pt)
         
@@ -538,11 +783,15 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
         self.on_color_changed()
 
     def on_file_format_changed(self):
+        if self._updating_ui:
+            return
+        
         old_path = self.page.save_path_le.text.strip()
         if old_path != '':
             path = Path(old_path)
-            settings = self.settings_from_ui()
-            new_suffix = settings.file_format.suffix
+            # NOTE: only the file format is needed, not a full settings_from_ui() pass
+            file_format, _ = _FILE_FORMAT_CHOICES[self.page.file_format_cob.currentText]
+            new_suffix = file_format.suffix
             if path.suffix != new_suffix:
                 path = path.with_suffix(new_suffix)
             self.page.save_path_le.setText(str(path))
@@ -550,62 +799,58 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
     def on_figure_width_changed(self):
         if Debugging.DEBUG:
             debug("VectorFileExportDialog.on_figure_width_changed")
+        
+        # NOTE: _update_ui_from_settings already wrote the values derived from the same DesignInfo
+        if self._updating_ui:
+            return
     
         self.page.figure_size_rb.setChecked(True)
         
-        settings = self.settings_from_ui()
-        design_info = DesignInfo.for_layout_view(pya.LayoutView.current(), settings)
+        settings = self._content_scaling_settings_from_ui()
+        design_info = self.design_info_for_settings(settings)
 
-        self.page.figure_height_sb.blockSignals(True)
-        self.page.scaling_sb.blockSignals(True)
-
-        self.page.figure_height_sb.setValue(design_info.fig_height_mm)
-        self.page.scaling_sb.setValue(design_info.scaling)
-        
-        self.page.figure_height_sb.blockSignals(False)
-        self.page.scaling_sb.blockSignals(False)
+        with signals_blocked(self.page.figure_height_sb, self.page.scaling_sb):
+            self.page.figure_height_sb.setValue(design_info.fig_height_mm)
+            self.page.scaling_sb.setValue(design_info.scaling)
     
     def on_figure_height_changed(self):
         if Debugging.DEBUG:
             debug("VectorFileExportDialog.on_figure_height_changed")
+        
+        if self._updating_ui:
+            return
     
         self.page.figure_size_rb.setChecked(True)
 
-        settings = self.settings_from_ui()
-        design_info = DesignInfo.for_layout_view(pya.LayoutView.current(), settings)
+        settings = self._content_scaling_settings_from_ui()
+        design_info = self.design_info_for_settings(settings)
         
         width_mm = design_info.width_um / design_info.height_um * self.page.figure_height_sb.value
+        
+        # NOTE: the scaling has to follow the new figure width,
+        #       the layout geometry of the DesignInfo is reused for that
+        settings = dataclasses.replace(settings, content_scaling_value=width_mm)
+        design_info = self.design_info_for_settings(settings)
 
-
-        settings = self.settings_from_ui()
-        design_info = DesignInfo.for_layout_view(pya.LayoutView.current(), settings)
-
-        self.page.figure_width_sb.blockSignals(True)
-        self.page.scaling_sb.blockSignals(True)
-
-        self.page.figure_width_sb.setValue(width_mm)
-        self.page.scaling_sb.setValue(design_info.scaling)
-
-        self.page.figure_width_sb.blockSignals(False)
-        self.page.scaling_sb.blockSignals(False)
+        with signals_blocked(self.page.figure_width_sb, self.page.scaling_sb):
+            self.page.figure_width_sb.setValue(width_mm)
+            self.page.scaling_sb.setValue(design_info.scaling)
 
     def on_scaling_value_changed(self):
         if Debugging.DEBUG:
             debug("VectorFileExportDialog.on_scaling_value_changed")
+        
+        if self._updating_ui:
+            return
 
         self.page.scaling_rb.setChecked(True)
             
-        settings = self.settings_from_ui()
-        design_info = DesignInfo.for_layout_view(pya.LayoutView.current(), settings)
+        settings = self._content_scaling_settings_from_ui()
+        design_info = self.design_info_for_settings(settings)
         
-        self.page.figure_width_sb.blockSignals(True)
-        self.page.figure_height_sb.blockSignals(True)
-        
-        self.page.figure_width_sb.setValue(design_info.fig_width_mm)
-        self.page.figure_height_sb.setValue(design_info.fig_height_mm)
-    
-        self.page.figure_width_sb.blockSignals(False)
-        self.page.figure_height_sb.blockSignals(False)
+        with signals_blocked(self.page.figure_width_sb, self.page.figure_height_sb):
+            self.page.figure_width_sb.setValue(design_info.fig_width_mm)
+            self.page.figure_height_sb.setValue(design_info.fig_height_mm)
     
     def on_color_changed(self):
         self.include_bg_color_cb.setEnabled(self.colors_cob.currentText == 'Color')
@@ -617,18 +862,11 @@ class VectorFileExportDialog(pya.QDialog, ProgressReporter):
         try:
             lru_path = FileSystemHelpers.least_recent_directory()
             
-            file_filter: str
-            suffix: str
-            
-            settings = self.settings_from_ui()
-            if settings.file_format == VectorFileFormat.PDF:
-                file_filter = 'PDF (*.pdf)'
-                suffix = '.pdf'
-            elif settings.file_format == VectorFileFormat.SVG:
-                file_filter = 'SVG (*.svg)'
-                suffix = '.svg'
-            else:
-                raise NotImplementedError(f"Unhandled enum case {settings.file_format}")
+            file_format, _ = _FILE_FORMAT_CHOICES[self.page.file_format_cob.currentText]
+            file_filter_and_suffix = _FILE_FORMAT_FILTERS.get(file_format)
+            if file_filter_and_suffix is None:
+                raise NotImplementedError(f"Unhandled enum case {file_format}")
+            file_filter, suffix = file_filter_and_suffix
 
             file_path_str = pya.QFileDialog.getSaveFileName(
                 self,               
@@ -36,7 +36,6 @@ from klayout_plugin_utils.qt_helpers import qmessagebox_critical
 from klayout_plugin_utils.str_enum_compat import StrEnum
 
 from previous_ui_settings import PreviousUISettings, CONFIG_KEY__VECTOR_FILE_EXPORT_SETTINGS
-from vector_file_export_dialog import VectorFileExportDialog
 from vector_file_export_settings import *
 
 #--------------------------------------------------------------------------------
@@ -85,6 +84,9 @@ class VectorFileExportPluginFactory(pya.PluginFactory):
 
         mw = pya.MainWindow.instance()
         try:
+            # NOTE: the dialog (and its dependencies) is only imported once it is needed,
+            #       not already when KLayout starts up and registers the plugin
+            from vector_file_export_dialog import VectorFileExportDialog
             self.dialog = VectorFileExportDialog(settings=settings, parent=mw)
         except Exception as e:
             print(f"ERROR: Failed to open vector file export dialog due to exception: {e}")
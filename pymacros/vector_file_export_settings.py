@@ -19,10 +19,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from functools import cached_property
 import json
-import os
 from pathlib import Path
+import sys
 from typing import *
 
 #
@@ -79,6 +78,7 @@ class TextMode(DualStrEnum):
 class GeometryReduction(StrEnum):
     NONE = 'none'
     OMIT_SMALL_POLYGONS = 'omit_small_polygons'
+    SIMPLIFY_POLYGONS = 'simplify_polygons'  # snap outlines to half a pixel, drop redundant points
 
 
 class LayerSelectionMode(DualStrEnum):
@@ -88,7 +88,83 @@ class LayerSelectionMode(DualStrEnum):
     CUSTOM_LIST = 'custom_layer_list', 'Custom List'
 
 
-@dataclass
+def _enum_decoder(enum_cls: Type[StrEnum]) -> Callable[[str], StrEnum]:
+    """
+    Decoder for stored enum values, the members are looked up in a table built once,
+    instead of going through the enum constructor each time
+    """
+    members = {m.value: m for m in enum_cls}
+    
+    def decode(s: str) -> StrEnum:
+        member = members.get(s, None)
+        if member is None:
+            raise ValueError(f"'{s}' is not a valid {enum_cls.__name__}")
+        return member
+    
+    return decode
+
+
+_decode_file_format = _enum_decoder(VectorFileFormat)
+
+
+def _file_format_from_str(s: str) -> VectorFileFormat:
+    # Backwards compat: strip leading dot if present (old format used '.pdf')
+    return _decode_file_format(s.lstrip('.'))
+
+
+# Backwards compat: older versions stored the UI label
+_COLOR_MODES: Dict[str, ColorMode] = {
+    **{m.ui_label: m for m in ColorMode},
+    **{m.value: m for m in ColorMode},
+}
+
+
+def _color_mode_from_str(s: str) -> Optional[ColorMode]:
+    return _COLOR_MODES.get(s, None)
+
+
+def _bool_from_str(s: str) -> bool:
+    return bool(int(s))
+
+
+def _bool_to_str(b: bool) -> str:
+    return str(int(b))
+
+
+def _enum_to_str(e: StrEnum) -> str:
+    return e.value
+
+
+# (settings field name, decoder of the value stored by VectorFileExportSettings.dict(), encoder for it)
+# NOTE: from_dict() and dict() share this table, so they can't get out of sync
+_FIELD_CODECS: Tuple[Tuple[str, Callable[[str], Any], Callable[[Any], str]], ...] = (
+    ('file_format', _file_format_from_str, _enum_to_str),
+    ('output_path', Path, str),
+    ('title', str, str),
+    ('page_format', str, str),
+    ('page_orientation', _enum_decoder(PageOrientation), _enum_to_str),
+    ('content_scaling_style', _enum_decoder(ContentScaling), _enum_to_str),
+    ('content_scaling_value', float, str),
+    ('color_mode', _color_mode_from_str, _enum_to_str),
+    ('include_background_color', _bool_from_str, _bool_to_str),
+    ('include_stipples', _bool_from_str, _bool_to_str),
+    ('font_family', str, str),
+    ('font_size_mode', _enum_decoder(FontSizeMode), _enum_to_str),
+    ('font_size_pt', float, str),
+    ('font_size_percent_of_fig_width', float, str),
+    ('text_mode', _enum_decoder(TextMode), _enum_to_str),
+    ('text_layers_filter_enabled', _bool_from_str, _bool_to_str),
+    ('text_layers', str, str),
+    ('geometry_reduction', _enum_decoder(GeometryReduction), _enum_to_str),
+    ('layer_output_style', _enum_decoder(LayerOutputStyle), _enum_to_str),
+    ('layer_selection_mode', _enum_decoder(LayerSelectionMode), _enum_to_str),
+    ('custom_layers', str, str),
+)
+
+
+# NOTE: instances are created on every settings_from_ui() call, without a __dict__ they are smaller
+#       (slots require Python 3.10, on older versions this stays a regular dataclass)
+@dataclass(**({'slots': True} if sys.version_info >= (3, 10) else {}))
 class VectorFileExportSettings:
     file_format: VectorFileFormat = VectorFileFormat.PDF
     output_path: Union[str, Path] = ""
@@ -126,122 +202,17 @@ class VectorFileExportSettings:
     @classmethod
     def from_dict(cls, d: Dict[str, str]) -> VectorFileExportSettings:
         settings = VectorFileExportSettings()        
-    
-        file_format_str = d.get('file_format', None)
-        if file_format_str is not None:
-            # Backwards compat: strip leading dot if present (old format used '.pdf')
-            normalized = file_format_str.lstrip('.')
-            settings.file_format = VectorFileFormat(normalized)
-        
-        output_path_str = d.get('output_path', None)
-        if output_path_str is not None:
-            settings.output_path = Path(output_path_str)
-            
-        title_str = d.get('title', None)
-        if title_str is not None:
-            settings.title = title_str
-        
-        page_format_str = d.get('page_format', None)
-        if page_format_str is not None:
-            settings.page_format = page_format_str
-
-        page_orientation_str = d.get('page_orientation', None)
-        if page_orientation_str is not None:
-            settings.page_orientation = PageOrientation(page_orientation_str)
-            
-        content_scaling_style_str = d.get('content_scaling_style', None)
-        if content_scaling_style_str is not None:
-            settings.content_scaling_style = ContentScaling(content_scaling_style_str)
-
-        content_scaling_value_str = d.get('content_scaling_value', None)
-        if content_scaling_value_str is not None:
-            settings.content_scaling_value = float(content_scaling_value_str)
-
-        color_mode_str = d.get('color_mode', None)
-        if color_mode_str is not None:
-            try:
-                settings.color_mode = ColorMode(color_mode_str)
-            except ValueError:
-                LEGACY_COLOR_MODE = {m.ui_label: m for m in ColorMode}
-                if color_mode_str in LEGACY_COLOR_MODE:
-                    settings.color_mode = LEGACY_COLOR_MODE[color_mode_str]
         
-        include_background_color_str = d.get('include_background_color', None)
-        if include_background_color_str is not None:
-            settings.include_background_color = bool(int(include_background_color_str))
-
-        include_stipples_str = d.get('include_stipples', None)
-        if include_stipples_str is not None:
-            settings.include_stipples = bool(int(include_stipples_str))
-
-        font_family_str = d.get('font_family', None)
-        if font_family_str is not None:
-            settings.font_family = font_family_str
-
-        font_size_mode_str = d.get('font_size_mode', None)
-        if font_size_mode_str is not None:
-            settings.font_size_mode = FontSizeMode(font_size_mode_str)
-
-        font_size_pt_str = d.get('font_size_pt', None)
-        if font_size_pt_str is not None:
-            settings.font_size_pt = float(font_size_pt_str)
-
-        font_size_percent_of_fig_width_str = d.get('font_size_percent_of_fig_width', None)
-        if font_size_percent_of_fig_width_str is not None:
-            settings.font_size_percent_of_fig_width = float(font_size_percent_of_fig_width_str)
-
-        text_mode_str = d.get('text_mode', None)
-        if text_mode_str is not None:
-            settings.text_mode = TextMode(text_mode_str)
-
-        text_layers_filter_enabled_str = d.get('text_layers_filter_enabled', None)
-        if text_layers_filter_enabled_str is not None:
-            settings.text_layers_filter_enabled = bool(int(text_layers_filter_enabled_str))
-
-        text_layers_str = d.get('text_layers', None)
-        if text_layers_str is not None:
-            settings.text_layers = text_layers_str
-
-        geometry_reduction_str = d.get('geometry_reduction', None)
-        if geometry_reduction_str is not None:
-            settings.geometry_reduction = GeometryReduction(geometry_reduction_str)
-
-        layer_output_style_str = d.get('layer_output_style', None)
-        if layer_output_style_str is not None:
-            settings.layer_output_style = LayerOutputStyle(layer_output_style_str)
-
-        layer_selection_mode_str = d.get('layer_selection_mode', None)
-        if layer_selection_mode_str is not None:
-            settings.layer_selection_mode = LayerSelectionMode(layer_selection_mode_str)
-
-        custom_layers_str = d.get('custom_layers', None)
-        if custom_layers_str is not None:
-            settings.custom_layers = custom_layers_str
+        # NOTE: missing keys (and values that can't be mapped, see _color_mode_from_str) keep their defaults
+        for name, decode, _ in _FIELD_CODECS:
+            value_str = d.get(name, None)
+            if value_str is None:
+                continue
+            value = decode(value_str)
+            if value is not None:
+                setattr(settings, name, value)
 
         return settings
     
     def dict(self) -> Dict[str, str]:
-        return {
-            'file_format': self.file_format.value,
-            'output_path': str(self.output_path),
-            'title': str(self.title),
-            'page_format': self.page_format,
-            'page_orientation': self.page_orientation.value,
-            'content_scaling_style': self.content_scaling_style.value,
-            'content_scaling_value': str(self.content_scaling_value),
-            'color_mode': self.color_mode.value,
-            'include_background_color': str(int(self.include_background_color)),
-            'include_stipples': str(int(self.include_stipples)),
-            'font_family': self.font_family,
-            'font_size_mode': self.font_size_mode.value,
-            'font_size_pt': str(self.font_size_pt),
-            'font_size_percent_of_fig_width': str(self.font_size_percent_of_fig_width),
-            'text_mode': self.text_mode.value,
-            'text_layers_filter_enabled': str(int(self.text_layers_filter_enabled)),
-            'text_layers': self.text_layers,
-            'geometry_reduction': self.geometry_reduction.value,
-            'layer_output_style': self.layer_output_style.value,
-            'layer_selection_mode': self.layer_selection_mode.value,
-            'custom_layers': self.custom_layers
-        }
-    
+        return {name: encode(getattr(self, name)) for name, _, encode in _FIELD_CODECS}
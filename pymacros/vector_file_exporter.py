@@ -16,14 +16,17 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 #--------------------------------------------------------------------------------
 
+from __future__ import annotations
+
 import pya
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from klayout_plugin_utils.str_enum_compat import StrEnum
-from functools import cached_property
+from functools import cached_property, lru_cache
 import os
 from pathlib import Path
 import traceback
+import unittest
 from typing import *
 
 from klayout_plugin_utils.debugging import debug, Debugging
@@ -35,7 +38,89 @@ from stipple_cache import *
 from vector_file_export_settings import *
 
 
+@lru_cache(maxsize=64)
+def _page_size_id_for_name(page_format: str) -> Optional[int]:
+    # NOTE: the QPageSize names never change, so the linear scan over all page sizes is done only once per name
+    for i in range(pya.QPageSize.LastPageSize.to_i() + 1):
+        if pya.QPageSize(pya.QPageSize.PageSizeId(i)).name() == page_format:
+            return i
+    return None
+
+
+def _simplified_hull(points: Iterable[pya.DPoint], tolerance_um: float) -> List[Tuple[float, float]]:
+    """
+    The hull points snapped to a grid of tolerance_um,
+    points collapsing onto their predecessor and straight (collinear) midpoints are dropped
+    """
+    inv_tolerance = 1.0 / tolerance_um
+    
+    def is_straight(a: Tuple[int, int], b: Tuple[int, int], c: Tuple[int, int]) -> bool:
+        # NOTE: exact on the integer grid, spikes (going back on the same line) are kept
+        abx, aby = b[0] - a[0], b[1] - a[1]
+        bcx, bcy = c[0] - b[0], c[1] - b[1]
+        return abx * bcy - aby * bcx == 0 and abx * bcx + aby * bcy > 0
+    
+    kept: List[Tuple[int, int]] = []
+    for pt in points:
+        q = (round(pt.x * inv_tolerance), round(pt.y * inv_tolerance))
+        if kept and q == kept[-1]:
+            continue
+        while len(kept) >= 2 and is_straight(kept[-2], kept[-1], q):
+            kept.pop()
+        kept.append(q)
+    
+    # the hull is closed, also look across the first point
+    while len(kept) >= 2 and kept[-1] == kept[0]:
+        kept.pop()
+    while len(kept) >= 3 and is_straight(kept[-2], kept[-1], kept[0]):
+        kept.pop()
+    while len(kept) >= 3 and is_straight(kept[-1], kept[0], kept[1]):
+        kept.pop(0)
+    
+    return [(x * tolerance_um, y * tolerance_um) for x, y in kept]
+
+
+class ShapeKind(StrEnum):
+    TEXT = 'text'
+    BOX = 'box'
+    POLYGON = 'polygon'  # polygons and paths are both drawn as polygons
+    OTHER = 'other'      # not drawn (edges, points, ...)
+
+
+@dataclass
+class TextMetrics:
+    """
+    Metrics of the painter's font, the text bounding rects are memoized per string
+    (layouts tend to repeat the same labels many times)
+    """
+    font_metrics: pya.QFontMetrics
+    ascent: int = field(init=False)
+    descent: int = field(init=False)
+    bounding_rects: Dict[str, pya.QRect] = field(init=False, default_factory=dict)
+    
+    def __post_init__(self):
+        self.ascent = self.font_metrics.ascent()
+        self.descent = self.font_metrics.descent()
+    
+    @classmethod
+    def for_font(cls, font: pya.QFont) -> TextMetrics:
+        return TextMetrics(font_metrics=pya.QFontMetrics(font))
+    
+    def bounding_rect(self, text: str) -> pya.QRect:
+        rect = self.bounding_rects.get(text, None)
+        if rect is None:
+            rect = self.font_metrics.boundingRect(text)
+            self.bounding_rects[text] = rect
+        return rect
+
+
 class VectorFileExporter:
+    # NOTE: number of shapes between two cancel checks while painting a layer (power of 2)
+    CANCEL_CHECK_INTERVAL = 4096
+    
+    # NOTE: maximum number of boxes handed over to a single painter.drawRects call
+    RECT_BATCH_SIZE = 4096
+    
     def __init__(self, 
                  layout_view: pya.LayoutView,
                  settings: VectorFileExportSettings,
@@ -48,13 +133,17 @@ class VectorFileExporter:
     def create_painter(self) -> pya.QPainter:
         painter: pya.QPainter
     
-        output_path = Path(self.settings.output_path).resolve()
+        # NOTE: the document is rendered into memory and written to the output file
+        #       in a single call once it is complete (see export()),
+        #       instead of the writer emitting many small writes while painting
+        self._buffer = pya.QBuffer()
+        self._buffer.open(pya.QIODevice.WriteOnly)
     
         bbox = self.design_info.bbox
-        page_size: pya.QPageSize = self.page_size(self.settings)
+        page_size: pya.QPageSize = self.settings_page_size
 
         if self.settings.file_format == VectorFileFormat.PDF:
-            pdf = pya.QPdfWriter(str(output_path))
+            pdf = pya.QPdfWriter(self._buffer)
             pdf.setResolution(72)
             pdf.setTitle(self.settings.title)
             dev = pdf.asQPagedPaintDevice()
@@ -70,26 +159,19 @@ class VectorFileExporter:
             self._pdf = pdf
         elif self.settings.file_format == VectorFileFormat.SVG:
             svg = pya.QSvgGenerator()
-            svg.setFileName(str(output_path))
+            svg.setOutputDevice(self._buffer)
             svg.setResolution(72)
             svg.setTitle(self.settings.title)
 
             # Canvas = full page size (like PDF), not just the figure/design size.
             # QSvgGenerator has no orientation concept, so we apply it manually
             # by swapping width/height for portrait vs landscape.
-            page_size_pt = page_size.sizePoints()
-
             raw_w = int(self.design_info.fig_width_pt)
             raw_h = int(self.design_info.fig_height_pt)
 
-            if self.settings.page_orientation == PageOrientation.PORTRAIT:
-                page_w = int(min(page_size_pt.width, page_size_pt.height))
-                page_h = int(max(page_size_pt.width, page_size_pt.height))
-            elif self.settings.page_orientation == PageOrientation.LANDSCAPE:
-                page_w = int(max(page_size_pt.width, page_size_pt.height))
-                page_h = int(min(page_size_pt.width, page_size_pt.height))
-            else:
-                raise NotImplementedError(f"Unhandled enum case {self.settings.page_orientation}")
+            width, height = self.oriented_page_size_pt
+            page_w = int(width)
+            page_h = int(height)
         
             fig_size_pt = pya.QSize(page_w, page_h)
             svg.setSize(fig_size_pt)
@@ -108,17 +190,74 @@ class VectorFileExporter:
         pen.setCosmetic(True)
         return pen        
 
+    def layer_pen(self, lp: pya.LayerPropertiesNodeRef, width_f: float) -> pya.QPen:
+        frame_color = pya.QColor(lp.eff_frame_color())
+        
+        # frame_color = pya.QColor(lp.eff_fill_color())
+        # fill_color = pya.QColor(lp.eff_fill_color())
+        
+        if self.settings.color_mode == ColorMode.GREYSCALE:
+            # luminosity-based conversion: preserves perceived brightness
+            gray_value = int(0.299 * frame_color.red +\
+                             0.587 * frame_color.green +\
+                             0.114 * frame_color.blue)
+            return self.pen(color=pya.QColor(gray_value, gray_value, gray_value), width_f=width_f)
+        elif self.settings.color_mode == ColorMode.COLOR:
+            return self.pen(color=frame_color, width_f=width_f)
+        else:
+            raise NotImplementedError(f"Unhandled ColorMode enum case {self.settings.color_mode}")
+
     @property
     def pen_width(self) -> float:
         return max(self.design_info.dbu, self.design_info.um_per_pixel * 0.4)        
     
     def page_size(self, settings: VectorFileExportSettings) -> pya.QPageSize:
-        for i in range(pya.QPageSize.LastPageSize.to_i() + 1):
-            page_size = pya.QPageSize(pya.QPageSize.PageSizeId(i))
-            if page_size.name() == settings.page_format:
-                return page_size
+        page_size_id = _page_size_id_for_name(settings.page_format)
+        if page_size_id is not None:
+            return pya.QPageSize(pya.QPageSize.PageSizeId(page_size_id))
         raise Exception(f"Failed to obtain QPageSize for page format name '{settings.page_format}'")
     
+    @cached_property
+    def simplify_tolerance_um(self) -> Optional[float]:
+        """
+        Grid the polygon outlines are snapped to, None if they are drawn as they are
+        """
+        if self.settings.geometry_reduction != GeometryReduction.SIMPLIFY_POLYGONS:
+            return None
+        tolerance_um = self.design_info.simplify_tolerance_um
+        if not (0.0 < tolerance_um < float('inf')):
+            return None
+        return tolerance_um
+    
+    @cached_property
+    def output_path(self) -> Path:
+        # NOTE: no resolve(), a relative path is written relative to the working directory anyway,
+        #       so the symlink resolution would only cost file system calls
+        return Path(self.settings.output_path).expanduser()
+    
+    @cached_property
+    def settings_page_size(self) -> pya.QPageSize:
+        return self.page_size(self.settings)
+    
+    @cached_property
+    def page_size_pt(self) -> pya.QSizeF:
+        return self.settings_page_size.sizePoints()
+    
+    @cached_property
+    def oriented_page_size_pt(self) -> Tuple[float, float]:
+        """
+        (width, height) of the page in points, with the page orientation applied
+        """
+        page_size_pt = self.page_size_pt
+        short_side = min(page_size_pt.width, page_size_pt.height)
+        long_side = max(page_size_pt.width, page_size_pt.height)
+        if self.settings.page_orientation == PageOrientation.PORTRAIT:
+            return short_side, long_side
+        elif self.settings.page_orientation == PageOrientation.LANDSCAPE:
+            return long_side, short_side
+        else:
+            raise NotImplementedError(f"Unhandled PageOrientation enum case {self.settings.page_orientation}")
+    
     def prepare_painter(self, painter: pya.QPainter):
         dbu = self.design_info.dbu
     
@@ -141,19 +280,7 @@ class VectorFileExporter:
         font.setPointSizeF(font_size_pt)
         painter.setFont(font)
         
-        page_size_pt = self.page_size(self.settings).sizePoints()
-        
-        width: float
-        height: float
-        
-        if self.settings.page_orientation == PageOrientation.PORTRAIT:
-            width = min(page_size_pt.width, page_size_pt.height)
-            height = max(page_size_pt.width, page_size_pt.height)
-        elif self.settings.page_orientation == PageOrientation.LANDSCAPE:
-            width = max(page_size_pt.width, page_size_pt.height)
-            height = min(page_size_pt.width, page_size_pt.height)
-        else:
-            raise NotImplementedError()
+        width, height = self.oriented_page_size_pt
         
         offset_x = (width - self.design_info.fig_width_pt) / 2
         offset_y = (height - self.design_info.fig_height_pt) / 2
@@ -163,13 +290,20 @@ class VectorFileExporter:
         # since Qt's page layout already handles it.
         # For SVG there are no margins, so offset centers the design on canvas.
 
-        painter.translate(offset_x, offset_y + self.design_info.fig_height_pt)
-
-        # Scale layout units → points, flip Y
-        painter.scale(self.design_info.scale_um_to_pt, -self.design_info.scale_um_to_pt)
-         
-        # optional: move origin again if needed
-        painter.translate(-self.design_info.bbox.left, -self.design_info.bbox.bottom)
+        # NOTE: a single transform, instead of the equivalent sequence
+        #           translate(offset_x, offset_y + fig_height_pt)
+        #           scale(s, -s)                                     # layout units → points, flip Y
+        #           translate(-bbox.left, -bbox.bottom)              # move origin to the design bbox
+        #       which maps (x, y) to
+        #           x' = s * x + (offset_x - s * bbox.left)
+        #           y' = -s * y + (offset_y + fig_height_pt + s * bbox.bottom)
+        s = self.design_info.scale_um_to_pt
+        bbox = self.design_info.bbox
+        transform = pya.QTransform(s, 0.0,
+                                   0.0, -s,
+                                   offset_x - s * bbox.left,
+                                   offset_y + self.design_info.fig_height_pt + s * bbox.bottom)
+        painter.setWorldTransform(transform, True)  # combined, like translate() and scale()
 
 
     def draw_stipple(self,
@@ -228,145 +362,293 @@ class VectorFileExporter:
         if Debugging.DEBUG:
             debug(f"VectorFileExporter.draw_stipple: exit")
 
-    def draw_shape(self,
-                   painter: pya.QPainter,
-                   shape: pya.Shape,
-                   trans: pya.DTrans,
-                   stipple_panel: Optional[StipplePanel]) -> bool:
-        dbu = self.design_info.dbu
-        font_metrics = pya.QFontMetrics(painter.font)
-        def draw_text(shape: pya.Shape):
-            # NOTE: trans is in µm units
-            #       shape.text gives integer-unit object
-            #       shape.dtext gives µm-unit object
-            text = shape.dtext
-            full_trans = trans * text.trans
-            disp = full_trans.disp
-            world_pos_um = pya.QPointF(disp.x, - disp.y)
-            
-            t = painter.worldTransform
-            
-            # Remove Y flip
-            t_no_flip = pya.QTransform(t)
-            t_no_flip.scale(1.0, -1.0)
-            # t_no_flip = pya.QTransform(
-            #    t.m11(),  t.m12(),  0,
-            #    t.m21(), -t.m22(),  0,
-            #    t.dx(),   t.dy()
-            #)
-            device_pos = t_no_flip.map(world_pos_um)
-
-            text_rect = font_metrics.boundingRect(text.string)
-            x = device_pos.x
-            y = device_pos.y
-            
-            if text.halign in (pya.Text.HAlignLeft,
-                               pya.Text.NoHAlign):
-                pass
-            elif text.halign == pya.Text.HAlignCenter:
-                x -= text_rect.width / 2
-            elif text.halign == pya.Text.HAlignRight:
-                x -= text_rect.width
-            else:
-                raise NotImplementedError(f"Unhandled pya.Text h alignment {text.halign}")
-            
-            if text.valign in (pya.Text.VAlignBottom,
-                               pya.Text.NoVAlign):
-                y += text_rect.height - font_metrics.descent()
-            elif text.valign == pya.Text.VAlignTop:
-                y -= font_metrics.ascent()
-            elif text.valign == pya.Text.VAlignCenter:
-                y += text_rect.height / 2 - font_metrics.descent()
-            else:
-                raise NotImplementedError(f"Unhandled pya.Text v alignment {text.valign}")
-            
-            painter.save()
-            painter.resetTransform()  # no scaling, no flipping
-            painter.translate(pya.QPointF(x, y))
-            # painter.rotate(-full_trans.rot() * 90)
-            painter.drawText(0, 0, text.string)
-            # painter.drawText(pya.QPointF(x, y), text.string)
-            painter.restore()
+    @staticmethod
+    def shape_kind(shape: pya.Shape) -> ShapeKind:
+        # NOTE: hot-spot, every is_*() test is a binding call
+        if shape.is_text():
+            return ShapeKind.TEXT
+        elif shape.is_box():
+            return ShapeKind.BOX
+        elif shape.is_polygon()\
+             or shape.is_path():
+            return ShapeKind.POLYGON
+        else:
+            return ShapeKind.OTHER
+
+    def draw_text(self,
+                  painter: pya.QPainter,
+                  shape: pya.Shape,
+                  trans: pya.DTrans,
+                  text_metrics: TextMetrics,
+                  text_device_transform: Optional[pya.QTransform] = None,
+                  text_batch: Optional[List[Tuple[pya.QPointF, str]]] = None):
+        # NOTE: trans is in µm units
+        #       shape.text gives integer-unit object
+        #       shape.dtext gives µm-unit object
+        text = shape.dtext
+        # NOTE: hot-spot, only the position of the composed transformation (trans * text.trans) is used,
+        #       transforming the text position gives it without creating the composed transformation
+        pos = trans * text.position()
+        world_pos_um = pya.QPointF(pos.x, - pos.y)
+        
+        if text_device_transform is None:
+            text_device_transform = self.text_device_transform(painter)
+        device_pos = text_device_transform.map(world_pos_um)
+
+        text_rect = text_metrics.bounding_rect(text.string)
+        x = device_pos.x
+        y = device_pos.y
+        
+        if text.halign in (pya.Text.HAlignLeft,
+                           pya.Text.NoHAlign):
+            pass
+        elif text.halign == pya.Text.HAlignCenter:
+            x -= text_rect.width / 2
+        elif text.halign == pya.Text.HAlignRight:
+            x -= text_rect.width
+        else:
+            raise NotImplementedError(f"Unhandled pya.Text h alignment {text.halign}")
+        
+        if text.valign in (pya.Text.VAlignBottom,
+                           pya.Text.NoVAlign):
+            y += text_rect.height - text_metrics.descent
+        elif text.valign == pya.Text.VAlignTop:
+            y -= text_metrics.ascent
+        elif text.valign == pya.Text.VAlignCenter:
+            y += text_rect.height / 2 - text_metrics.descent
+        else:
+            raise NotImplementedError(f"Unhandled pya.Text v alignment {text.valign}")
+        
+        # NOTE: hot-spot, the text is drawn in device coordinates (no scaling, no flipping),
+        #       disabling the world transform is cheaper than a save() / resetTransform() / restore() per text,
+        #       with a batch it is disabled only once for all texts of the batch (see flush_text_batch)
+        # painter.rotate(-(trans * text.trans).rot() * 90)
+        if text_batch is not None:
+            text_batch.append((pya.QPointF(x, y), text.string))
+            return
+        painter.setWorldMatrixEnabled(False)
+        painter.drawText(pya.QPointF(x, y), text.string)
+        painter.setWorldMatrixEnabled(True)
+    
+    @staticmethod
+    def text_device_transform(painter: pya.QPainter) -> pya.QTransform:
+        """
+        The painter's world transform without the Y flip, maps text positions to device coordinates
+        """
+        t = painter.worldTransform
+        
+        # Remove Y flip
+        t_no_flip = pya.QTransform(t)
+        t_no_flip.scale(1.0, -1.0)
+        # t_no_flip = pya.QTransform(
+        #    t.m11(),  t.m12(),  0,
+        #    t.m21(), -t.m22(),  0,
+        #    t.dx(),   t.dy()
+        #)
+        return t_no_flip
+    
+    def draws_directly(self, stipple_panel: Optional[StipplePanel]) -> bool:
+        # NOTE: hot-spot, for PDF without stipples the outline is drawn as is,
+        #       a QPainterPath is only needed for the device mapping (SVG) or as stipple clip path
+        return stipple_panel is None and self.settings.file_format == VectorFileFormat.PDF
+    
+    def contour_polygon(self, points: Iterable[pya.DPoint]) -> pya.QPolygonF:
+        # NOTE: hot-spot, hand over the whole contour at once,
+        #       instead of one moveTo/lineTo binding call per point
+        QPointF = pya.QPointF  # NOTE: hot-spot, avoid the module attribute lookup per point
+        simplify_tolerance_um = self.simplify_tolerance_um
+        if simplify_tolerance_um is None:
+            return pya.QPolygonF([QPointF(pt.x, pt.y) for pt in points])
+        # NOTE: details below half a pixel are not visible anyway,
+        #       the dropped points save binding calls and bytes in the output file
+        return pya.QPolygonF([QPointF(x, y) for x, y in _simplified_hull(points, simplify_tolerance_um)])
+    
+    def draw_polygon(self,
+                     painter: pya.QPainter,
+                     p: pya.DPolygon,
+                     trans: pya.DTrans,
+                     stipple_panel: Optional[StipplePanel],
+                     draw_directly: bool,
+                     outline_batch: Optional[pya.QPainterPath] = None):
+        p = p.transformed(trans)
+        
+        hull = self.contour_polygon(p.each_point_hull())
+        num_holes = p.holes()
         
-        def draw_polygon(p: pya.DPolygon):
-            #
-            # draw main polygon
-            #
-            p = p.transformed(trans)
+        # NOTE: hot-spot, hole-free polygons (the common case) are drawn as a single QPolygonF,
+        #       the holes are only drawn as further contours when there are any
+        #       (a QPainterPath fills odd-even, so a stipple clipped to it leaves the holes out)
+        if draw_directly:
+            painter.drawPolygon(hull)
+            for i in range(num_holes):
+                painter.drawPolygon(self.contour_polygon(p.each_point_hole(i)))
+            return
+        
+        poly_path: pya.QPainterPath
+        if stipple_panel is None and outline_batch is not None:
+            poly_path = outline_batch
+        else:
             poly_path = pya.QPainterPath()
-            pts = p.each_point_hull()
-            
-            first = next(pts)
-            poly_path.moveTo(pya.QPointF(first.x, first.y))
-            for pt in pts:
-                poly_path.lineTo(pya.QPointF(pt.x, pt.y))
+        poly_path.addPolygon(hull)
+        poly_path.closeSubpath()
+        for i in range(num_holes):
+            poly_path.addPolygon(self.contour_polygon(p.each_point_hole(i)))
             poly_path.closeSubpath()
-            
-            if self.settings.file_format == VectorFileFormat.PDF:
-                painter.drawPath(poly_path)
-            elif self.settings.file_format ==  VectorFileFormat.SVG:
-                # Map to device space explicitly, never trust QSvgGenerator
-                # to apply the world transform correctly
-
-                world_trans = painter.worldTransform
-                poly_path = world_trans.map(poly_path)
-                
-                painter.save()
-                painter.resetTransform()
-                # Pen must be non-cosmetic with a device-space width,
-                # since we're drawing in device coordinates after resetTransform.
-                # cosmetic pen_width is in µm — meaningless in device space.
-                device_pen = pya.QPen(painter.pen().color)
-                device_pen.setWidthF(1.0)
-                device_pen.setCosmetic(False)
-                painter.setPen(device_pen)                    
-                painter.drawPath(poly_path)
-                painter.restore()
+        if poly_path is not outline_batch:
+            self.draw_polygon_path(painter, poly_path, stipple_panel)
+    
+    def draw_box(self,
+                 painter: pya.QPainter,
+                 b: pya.DBox,
+                 trans: pya.DTrans,
+                 stipple_panel: Optional[StipplePanel],
+                 draw_directly: bool,
+                 rect_batch: Optional[List[pya.QRectF]],
+                 outline_batch: Optional[pya.QPainterPath] = None):
+        # NOTE: hot-spot, a box is a single rectangle,
+        #       no need to create a QPointF per corner
+        b = b.transformed(trans)
+        rect = pya.QRectF(b.left, b.bottom, b.width(), b.height())
+        if draw_directly:
+            if rect_batch is None:
+                painter.drawRect(rect)
             else:
-                raise NotImplementedError(f"Unhandled VectorFileFormat enum case {self.settings.file_format}")
-            
-            #
-            # draw the stipple "fill"
-            # 
-            if stipple_panel is None:
-                # NOTE: hot-spot, no logging
-                # if Debugging.DEBUG:
-                #     debug(f"draw_polygon: stipple is None")
-                return
+                rect_batch.append(rect)
+                if len(rect_batch) >= self.RECT_BATCH_SIZE:
+                    self.flush_rect_batch(painter, rect_batch)
+            return
+        if stipple_panel is None and outline_batch is not None:
+            outline_batch.addRect(rect)
+            return
+        poly_path = pya.QPainterPath()
+        poly_path.addRect(rect)
+        self.draw_polygon_path(painter, poly_path, stipple_panel)
+    
+    def draw_polygon_path(self,
+                          painter: pya.QPainter,
+                          poly_path: pya.QPainterPath,
+                          stipple_panel: Optional[StipplePanel]):
+        #
+        # draw main polygon
+        #
+        if self.settings.file_format == VectorFileFormat.PDF:
+            painter.drawPath(poly_path)
+        elif self.settings.file_format ==  VectorFileFormat.SVG:
+            # Map to device space explicitly, never trust QSvgGenerator
+            # to apply the world transform correctly
+
+            world_trans = painter.worldTransform
+            poly_path = world_trans.map(poly_path)
             
-            self.draw_stipple(painter, poly_path, stipple_panel)
+            painter.save()
+            painter.resetTransform()
+            # Pen must be non-cosmetic with a device-space width,
+            # since we're drawing in device coordinates after resetTransform.
+            # cosmetic pen_width is in µm — meaningless in device space.
+            device_pen = pya.QPen(painter.pen().color)
+            device_pen.setWidthF(1.0)
+            device_pen.setCosmetic(False)
+            painter.setPen(device_pen)                    
+            painter.drawPath(poly_path)
+            painter.restore()
+        else:
+            raise NotImplementedError(f"Unhandled VectorFileFormat enum case {self.settings.file_format}")
         
-        if shape.is_box()\
-           or shape.is_polygon()\
-           or shape.is_path():
-            bbox = shape.dbbox()
-            
-            # Skip small shapes
-            if bbox.width() < self.design_info.min_feature_size_um \
-               or bbox.height() < self.design_info.min_feature_size_um:
-                # NOTE: do not log, hotspot
-                # if Debugging.DEBUG:
-                #    debug(f"VectorFileExporter.draw_shape: {shape} is too small ({bbox.width()} x {bbox.height()} µm)")
-                #return False
-                pass
+        #
+        # draw the stipple "fill"
+        # 
+        if stipple_panel is None:
+            # NOTE: hot-spot, no logging
+            # if Debugging.DEBUG:
+            #     debug(f"draw_polygon: stipple is None")
+            return
         
-        if shape.is_box():
-            draw_polygon(shape.dpolygon)
-            
-            # TODO: perhaps speed up things by using boxes instead of polygons
-            # b = shape.dbox.transformed(trans)
-            # rect = pya.QRectF(b.left, b.bottom, b.width(), b.height())
-            # painter.drawRect(rect)
-        elif shape.is_polygon():
-            draw_polygon(shape.dpolygon)
-        elif shape.is_path():
-            draw_polygon(shape.dpolygon)
-        elif shape.is_text():
-            draw_text(shape)
+        self.draw_stipple(painter, poly_path, stipple_panel)
+
+    def draw_shape(self,
+                   painter: pya.QPainter,
+                   shape: pya.Shape,
+                   trans: pya.DTrans,
+                   stipple_panel: Optional[StipplePanel],
+                   shape_kind: Optional[ShapeKind] = None,
+                   text_metrics: Optional[TextMetrics] = None,
+                   rect_batch: Optional[List[pya.QRectF]] = None,
+                   outline_batch: Optional[pya.QPainterPath] = None,
+                   text_device_transform: Optional[pya.QTransform] = None,
+                   text_batch: Optional[List[Tuple[pya.QPointF, str]]] = None) -> bool:
+        """
+        NOTE: if rect_batch is given, boxes that can be drawn directly are collected there
+              (the caller draws the batch with painter.drawRects, see flush_rect_batch)
+              if outline_batch is given, outlines without stipples that would be drawn one by one
+              with draw_polygon_path are added to it (the caller draws it, see flush_outline_batch)
+              if text_batch is given, the device positions and strings of texts are collected there
+              (the caller draws them, see flush_text_batch)
+        """
+        # NOTE: hot-spot, the drawing helpers are regular methods,
+        #       so no closures are created per shape
+        
+        # NOTE: skipping small shapes is disabled,
+        #       so don't compute the bounding box per shape (hot-spot)
+        # bbox = shape.dbbox()
+        # if bbox.width() < self.design_info.min_feature_size_um \
+        #    or bbox.height() < self.design_info.min_feature_size_um:
+        #     return False
+        
+        if shape_kind is None:
+            shape_kind = self.shape_kind(shape)
+        
+        if shape_kind == ShapeKind.TEXT:
+            # NOTE: paint_layers passes the metrics of the painter's font,
+            #       they are only created here for standalone calls
+            if text_metrics is None:
+                text_metrics = TextMetrics.for_font(painter.font)
+            self.draw_text(painter, shape, trans, text_metrics, text_device_transform, text_batch)
+        elif shape_kind == ShapeKind.BOX:
+            if trans.is_ortho():
+                self.draw_box(painter, shape.dbox, trans, stipple_panel, self.draws_directly(stipple_panel),
+                              rect_batch, outline_batch)
+            else:  # a rotated box is no box anymore
+                self.draw_polygon(painter, shape.dpolygon, trans, stipple_panel, self.draws_directly(stipple_panel),
+                                  outline_batch)
+        elif shape_kind == ShapeKind.POLYGON:
+            self.draw_polygon(painter, shape.dpolygon, trans, stipple_panel, self.draws_directly(stipple_panel),
+                              outline_batch)
         else:
             return False
         return True
 
+    @staticmethod
+    def flush_rect_batch(painter: pya.QPainter, rect_batch: List[pya.QRectF]):
+        if rect_batch:
+            painter.drawRects(rect_batch)
+            rect_batch.clear()
+    
+    @staticmethod
+    def flush_text_batch(painter: pya.QPainter, text_batch: List[Tuple[pya.QPointF, str]]):
+        if text_batch:
+            painter.setWorldMatrixEnabled(False)
+            for pos, string in text_batch:
+                painter.drawText(pos, string)
+            painter.setWorldMatrixEnabled(True)
+            text_batch.clear()
+    
+    def flush_outline_batch(self, painter: pya.QPainter, outline_batch: Optional[pya.QPainterPath]):
+        if outline_batch is not None and not outline_batch.isEmpty():
+            self.draw_polygon_path(painter, outline_batch, None)
+    
+    def stipple_panel_request(self, lp: pya.LayerPropertiesNodeRef) -> Tuple[Stipple, int, int]:
+        """
+        The stipple of a layer and the minimum panel size covering the whole design.
+        """
+        stipple_index = lp.eff_dither_pattern()
+        stipple_str = self.design_info.layout_view.get_stipple(stipple_index)
+        stipple = Stipple.from_klayout_string(stipple_str)
+        
+        bbox = self.design_info.bbox
+        min_w = int((bbox.width() * self.design_info.scale_um_to_pt + stipple.width*4) * 1.5)
+        min_h = int((bbox.height() * self.design_info.scale_um_to_pt + stipple.height*4) * 1.5)
+        return stipple, min_w, min_h
+    
     def draw_background(self, painter: pya.QPainter):
         painter.save()
         painter.resetTransform()  # device coordinates (points)
@@ -392,6 +674,46 @@ class VectorFileExporter:
         
         painter.restore()
     
+    def draws_background_color(self) -> bool:
+        if self.settings.color_mode == ColorMode.BLACK_AND_WHITE:
+            return False  # no background color in this mode (avoid black on black)
+        elif self.settings.color_mode == ColorMode.GREYSCALE:
+            return False  # no background color in this mode (avoid constrast issues)
+        elif self.settings.color_mode == ColorMode.COLOR:
+            return True
+        else:
+            raise NotImplementedError(f"Unhandled ColorMode enum case {self.settings.color_mode}")
+    
+    def text_filter(self,
+                    layer_properties_by_layer_index: Dict[int, pya.LayerPropertiesNodeRef]) -> Callable[[int, pya.Shape], bool]:
+        """
+        Predicate (layer index, text shape) -> whether the text is exported,
+        the text mode and the layer filter are resolved once, not per text shape
+        """
+        top_cell = self.design_info.cell
+        text_mode = self.settings.text_mode
+        
+        if text_mode == TextMode.NONE:
+            return lambda lyr_idx, shape: False
+        
+        mode_filter: Optional[Callable[[int, pya.Shape], bool]]
+        if text_mode == TextMode.ALL:
+            mode_filter = None
+        elif text_mode == TextMode.ALL_VISIBLE:
+            mode_filter = lambda lyr_idx, shape: layer_properties_by_layer_index[lyr_idx].visible
+        elif text_mode == TextMode.ONLY_TOP_CELL:
+            mode_filter = lambda lyr_idx, shape: shape.cell == top_cell
+        else:
+            raise NotImplementedError(f"Unhandled TextMode enum case {text_mode}")
+        
+        if not self.settings.text_layers_filter_enabled:
+            return mode_filter or (lambda lyr_idx, shape: True)
+        
+        text_filter_layers_indexes = frozenset(self.design_info.text_filter_layers_indexes)
+        if mode_filter is None:
+            return lambda lyr_idx, shape: lyr_idx in text_filter_layers_indexes
+        return lambda lyr_idx, shape: mode_filter(lyr_idx, shape) and lyr_idx in text_filter_layers_indexes
+    
     def paint_layers(self, painter: pya.QPainter, preview_mode: bool):
         top_cell = self.design_info.cell
         dbu = self.design_info.dbu
@@ -405,40 +727,19 @@ class VectorFileExporter:
             self.progress_reporter.begin_progress(maximum=num_layers)
         
         max_preview_shapes = 1000
-        if preview_mode:
+        
+        # NOTE: decided once, the background is drawn again on every new page
+        draws_background = self.settings.include_background_color and self.draws_background_color()
+        if draws_background:
+            # NOTE: the page filling background would paint over the preview frame of the design bbox,
+            #       so that frame is not drawn at all
+            self.draw_background(painter)
+        elif preview_mode:
             painter.drawRect(pya.QRectF(bbox.left, bbox.bottom, bbox.width(), bbox.height()))
-
-        if self.settings.include_background_color:
-            if self.settings.color_mode == ColorMode.BLACK_AND_WHITE:
-                pass  # no background color in this mode (avoid black on black)
-            elif self.settings.color_mode == ColorMode.GREYSCALE:
-                pass  # no background color in this mode (avoid constrast issues)
-            elif self.settings.color_mode == ColorMode.COLOR:
-                self.draw_background(painter)
-            else:
-                raise NotImplementedError(f"Unhandled ColorMode enum case {self.settings.color_mode}")
         
-        layer_properties_by_layer_index = {lp.layer_index(): lp for lp in self.design_info.layout_view.each_layer()}
+        layer_properties_by_layer_index = self.design_info.layer_properties_by_index
         
-        def is_valid_text(lyr_idx, iter, shape) -> bool:
-            if self.settings.text_mode == TextMode.NONE:
-                return False
-            elif self.settings.text_mode == TextMode.ALL:
-                pass  # honor filter below
-            elif self.settings.text_mode == TextMode.ALL_VISIBLE:
-                lp = layer_properties_by_layer_index[lyr]
-                if not lp.visible:
-                    return False
-            elif self.settings.text_mode == TextMode.ONLY_TOP_CELL:
-                if sh.cell != top_cell:
-                    return False
-            else:
-                raise NotImplementedError(f"Unhandled TextMode enum case {self.settings.text_mode}")
-            
-            if self.settings.text_layers_filter_enabled:
-                return lyr_idx in self.design_info.text_filter_layers_indexes
-            
-            return True
+        is_valid_text = self.text_filter(layer_properties_by_layer_index)
         
         def is_valid_polygon_layer(lp: pya.LayerInfo) -> bool:
             if self.settings.layer_selection_mode == LayerSelectionMode.NONE:
@@ -446,48 +747,90 @@ class VectorFileExporter:
             elif self.settings.layer_selection_mode == LayerSelectionMode.ALL:
                 return True
             elif self.settings.layer_selection_mode == LayerSelectionMode.ALL_VISIBLE:
-                lp = layer_properties_by_layer_index[lyr]
                 return lp.visible
             elif self.settings.layer_selection_mode == LayerSelectionMode.CUSTOM_LIST:
                 return lp.layer_index() in self.design_info.custom_layers_indexes
             else:
                 raise NotImplementedError(f"Unhandled LayerSelectionMode enum case {self.settings.layer_selection_mode}")
         
+        if self.settings.include_stipples and not preview_mode:
+            # NOTE: vectorize the stipple panels of all non-empty layers up front and concurrently,
+            #       the lazy per-layer preparation below then only has to load them
+            StippleCache.instance().prefetch(
+                self.stipple_panel_request(layer_properties_by_layer_index[lyr])
+                for lyr in self.design_info.all_layer_indexes
+                if is_valid_polygon_layer(layer_properties_by_layer_index[lyr])
+                   and not top_cell.bbox(lyr).empty()
+            )
+        
+        # NOTE: the layer pens are created up front, the layer loop then only has to set them
+        #       (black & white mode keeps the pen prepared by the caller)
+        #       layers of the same color share one pen object, so consecutive layers
+        #       of the same color don't set the pen again
+        layer_pens: Dict[int, pya.QPen] = {}
+        if self.settings.color_mode != ColorMode.BLACK_AND_WHITE:
+            width_f = painter.pen().widthF
+            pens_by_rgba: Dict[int, pya.QPen] = {}
+            for lyr in self.design_info.all_layer_indexes:
+                pen = self.layer_pen(layer_properties_by_layer_index[lyr], width_f)
+                layer_pens[lyr] = pens_by_rgba.setdefault(pen.color.rgba(), pen)
+        current_layer_pen: Optional[pya.QPen] = None
+        
+        # NOTE: hot-spot, resolve everything the shape loop needs only once per export
+        draw_shape = self.draw_shape
+        include_stipples = self.settings.include_stipples
+        text_metrics = TextMetrics.for_font(painter.font)  # the font doesn't change while painting the layers
+        # NOTE: neither does the world transform (everything changing it restores it),
+        #       it is only final here, render_preview scales the painter after prepare_painter
+        text_device_transform = self.text_device_transform(painter)
+        progress_reporter = self.progress_reporter
+        # NOTE: the cancel flag is only changed while events are processed (by the progress updates),
+        #       so it is polled every CANCEL_CHECK_INTERVAL shapes and after each layer
+        was_canceled = progress_reporter.was_canceled if progress_reporter is not None else None
+        cancel_check_mask = self.CANCEL_CHECK_INTERVAL - 1
+        visited_shapes = 0
+        
+        # NOTE: the kind of each shape type is resolved with the is_*() probes only once,
+        #       afterwards a single type() call per shape is enough
+        #       (also on layers mixing e.g. boxes and polygons)
+        shape_kinds_by_type: Dict[int, ShapeKind] = {}
+        
+        # NOTE: boxes of a layer share the pen, they are drawn in batches instead of one by one,
+        #       the batch is flushed before the pen or the page changes
+        rect_batch: List[pya.QRectF] = []
+        flush_rect_batch = self.flush_rect_batch
+        
+        # NOTE: for SVG, every outline drawn on its own is mapped to device space
+        #       and needs its own save()/restore() (a group element in the SVG file),
+        #       so the outlines of a layer without stipples are collected into one path instead,
+        #       drawn once at the end of the layer
+        batches_outlines = self.settings.file_format == VectorFileFormat.SVG
+        flush_outline_batch = self.flush_outline_batch
+        
+        # NOTE: texts are drawn in device coordinates, they are collected per layer,
+        #       so the world transform is only disabled and enabled again once per layer
+        text_batch: List[Tuple[pya.QPointF, str]] = []
+        flush_text_batch = self.flush_text_batch
+        
+        polygon_shape_flags = pya.Shapes.SBoxes | pya.Shapes.SPolygons | pya.Shapes.SPaths
+        texts_exported = self.settings.text_mode != TextMode.NONE
+        
         drawn_shapes = 0
         for lyr in self.design_info.all_layer_indexes:
             found_shapes_on_layer = False
 
             lp = layer_properties_by_layer_index[lyr]
             valid_polygon_layer = is_valid_polygon_layer(lp)
+            outline_batch = pya.QPainterPath() if batches_outlines else None
             
-            if self.settings.color_mode != ColorMode.BLACK_AND_WHITE:
-                width_f = painter.pen().widthF
-                
-                frame_color = pya.QColor(lp.eff_frame_color())
-                
-                # print(f"layer_index={lyr} {lp.name}: eff_frame_color={lp.eff_frame_color()} {frame_color.name()}")
-                # frame_color = pya.QColor(lp.eff_fill_color())
-                # fill_color = pya.QColor(lp.eff_fill_color())
-                
-                if self.settings.color_mode == ColorMode.BLACK_AND_WHITE:
-                    pass  # should never be called
-                elif self.settings.color_mode == ColorMode.GREYSCALE:
-                    # luminosity-based conversion: preserves perceived brightness
-                    gray_value = int(0.299 * frame_color.red +\
-                                     0.587 * frame_color.green +\
-                                     0.114 * frame_color.blue)
-                    pen = self.pen(color=pya.QColor(gray_value, gray_value, gray_value), width_f=width_f)
-                    painter.setPen(pen)
-                elif self.settings.color_mode == ColorMode.COLOR:
-                    pen = self.pen(color=frame_color, width_f=width_f)
-                    painter.setPen(pen)
-                else:
-                    raise NotImplementedError(f"Unhandled ColorMode enum case {self.settings.color_mode}")
-                
+            layer_pen = layer_pens.get(lyr, None)
+            if layer_pen is not None and layer_pen is not current_layer_pen:
+                painter.setPen(layer_pen)
+                current_layer_pen = layer_pen
             
             stipple_panel: Optional[StipplePanel] = None
             def prepare_stipple_panel():
-                if not self.settings.include_stipples:
+                if not include_stipples:
                     return
 
                 if not valid_polygon_layer:
@@ -498,12 +841,7 @@ class VectorFileExporter:
                 if stipple_panel is not None:
                     return  # already prepared
                     
-                stipple_index = lp.eff_dither_pattern()
-                stipple_str = self.design_info.layout_view.get_stipple(stipple_index)
-                stipple = Stipple.from_klayout_string(stipple_str)
-            
-                min_w = int((bbox.width() * self.design_info.scale_um_to_pt + stipple.width*4) * 1.5)
-                min_h = int((bbox.height() * self.design_info.scale_um_to_pt + stipple.height*4) * 1.5)
+                stipple, min_w, min_h = self.stipple_panel_request(lp)
                 if Debugging.DEBUG:
                     debug(f"VectorFileExporter.paint_layers: "
                           f"bbox={bbox.width():.3g} x {bbox.height():.3g} µm, "
@@ -520,55 +858,84 @@ class VectorFileExporter:
                 iter.min_depth = max(self.layout_view.min_hier_levels-1, 0)
                 iter.max_depth = max(self.layout_view.max_hier_levels-1, 0)
             
-            while not iter.at_end():
-                sh = iter.shape()
-                ### print(f"lyr {lyr}, sh = {sh}")
+            # NOTE: only the kinds of shapes that can be drawn on this layer are delivered,
+            #       the others are skipped by the iterator itself, not by the shape loop
+            shape_flags = 0
+            if valid_polygon_layer:
+                shape_flags |= polygon_shape_flags
+            if texts_exported:
+                shape_flags |= pya.Shapes.STexts
+            iter.shape_flags = shape_flags
+            
+            # NOTE: hot-spot, bind the per-shape methods once per layer
+            iter_at_end = iter.at_end
+            iter_shape = iter.shape
+            iter_dtrans = iter.dtrans
+            iter_next = iter.next
+            
+            while not iter_at_end():
+                sh = iter_shape()
+                shape_type = sh.type()
+                shape_kind = shape_kinds_by_type.get(shape_type, None)
+                if shape_kind is None:
+                    shape_kind = self.shape_kind(sh)
+                    shape_kinds_by_type[shape_type] = shape_kind
+                is_text = shape_kind == ShapeKind.TEXT
+                # NOTE: hot-spot, no per-shape logging
+                # if Debugging.DEBUG:
+                #     debug(f"VectorFileExporter.paint_layers: lyr {lyr}, sh = {sh}")
                 
                 if new_page_needed:
                     self._pdf.newPage()
                     new_page_needed = False
                     
-                    if self.settings.include_background_color:
-                        if self.settings.color_mode == ColorMode.BLACK_AND_WHITE:
-                            pass  # no background color in this mode (avoid black on black)
-                        elif self.settings.color_mode == ColorMode.GREYSCALE:
-                            pass  # no background color in this mode (avoid constrast issues)
-                        elif self.settings.color_mode == ColorMode.COLOR:
-                            self.draw_background(painter)
-                        else:
-                            raise NotImplementedError(f"Unhandled ColorMode enum case {self.settings.color_mode}")
+                    if draws_background:
+                        self.draw_background(painter)
                 
-                if not sh.is_text() or is_valid_text(lyr, iter, sh):
-                    if not sh.is_text():  # not required for text
+                if shape_kind == ShapeKind.OTHER:
+                    pass  # not drawn
+                elif not is_text or is_valid_text(lyr, sh):
+                    if not is_text:  # not required for text
                         prepare_stipple_panel()
                     
-                    if sh.is_text() or valid_polygon_layer:
-                        found_shapes = self.draw_shape(painter, sh, iter.dtrans(), stipple_panel)
-                        found_shapes_on_layer = found_shapes_on_layer or found_shapes
+                    if is_text or valid_polygon_layer:
+                        found_shapes = draw_shape(painter, sh, iter_dtrans(), stipple_panel, shape_kind, text_metrics,
+                                                  rect_batch, outline_batch, text_device_transform, text_batch)
+                        if found_shapes:
+                            found_shapes_on_layer = True
                         
                         if preview_mode and found_shapes:
                             drawn_shapes += 1
                             if drawn_shapes >= max_preview_shapes:
+                                flush_rect_batch(painter, rect_batch)
+                                flush_outline_batch(painter, outline_batch)
+                                flush_text_batch(painter, text_batch)
                                 return
                 
-                iter.next()
+                iter_next()
                 
-                if self.progress_reporter is not None:
-                    if self.progress_reporter.was_canceled():
-                        raise ExportCancelledError()
+                visited_shapes += 1
+                if visited_shapes & cancel_check_mask == 0\
+                   and was_canceled is not None and was_canceled():
+                    raise ExportCancelledError()
                 
+            flush_rect_batch(painter, rect_batch)
+            flush_outline_batch(painter, outline_batch)
+            flush_text_batch(painter, text_batch)
+            
             exported_layers += 1
-            if self.progress_reporter is not None:
-                self.progress_reporter.progress(dict(total_layers=num_layers, exported_layers=exported_layers))
+            if progress_reporter is not None:
+                progress_reporter.progress(dict(total_layers=num_layers, exported_layers=exported_layers))
+                if was_canceled():
+                    raise ExportCancelledError()
             
-            if found_shapes_on_layer\
-               and self.settings.layer_output_style == LayerOutputStyle.PAGE_PER_LAYER:
-                new_page_needed = found_shapes
-            else:
-                new_page_needed = False
+            # NOTE: a layer's page is done if any of its shapes was drawn,
+            #       not only if the last one was
+            new_page_needed = found_shapes_on_layer\
+                              and self.settings.layer_output_style == LayerOutputStyle.PAGE_PER_LAYER
 
     def render_preview(self, dpi: int) -> pya.QImage:
-        page_size_pt = self.page_size(self.settings).sizePoints()
+        page_size_pt = self.page_size_pt
         px_per_pt = dpi / 72.0
         
         image = pya.QImage(int(page_size_pt.width * px_per_pt), 
@@ -624,4 +991,51 @@ class VectorFileExporter:
                 traceback.print_exc()
             raise
         finally:
-            painter.end()    
+            painter.end()
+        
+        # NOTE: painter.end() has finished the document (also if the export was cancelled)
+        self._buffer.close()
+        self.output_path.write_bytes(self._buffer.data)
+
+#--------------------------------------------------------------------------------
+
+class SimplifiedHullTests(unittest.TestCase):
+    @staticmethod
+    def points(*coordinates: Tuple[float, float]) -> List[pya.DPoint]:
+        return [pya.DPoint(x, y) for x, y in coordinates]
+    
+    def test_snaps_to_tolerance_grid(self):
+        hull = _simplified_hull(self.points((0.1, -0.2), (2.2, 0.0), (1.9, 2.1), (0.0, 1.8)), 0.5)
+        self.assertEqual([(0.0, 0.0), (2.0, 0.0), (2.0, 2.0), (0.0, 2.0)], hull)
+    
+    def test_collinear_midpoint_dropped(self):
+        hull = _simplified_hull(self.points((0, 0), (1, 0), (2, 0), (2, 2), (0, 2)), 0.5)
+        self.assertEqual([(0.0, 0.0), (2.0, 0.0), (2.0, 2.0), (0.0, 2.0)], hull)
+    
+    def test_points_collapsing_onto_predecessor_dropped(self):
+        hull = _simplified_hull(self.points((0, 0), (0.1, 0.1), (2, 0), (2, 2), (0, 2), (0.1, 0)), 0.5)
+        self.assertEqual([(0.0, 0.0), (2.0, 0.0), (2.0, 2.0), (0.0, 2.0)], hull)
+    
+    def test_straight_run_across_start_point_dropped(self):
+        # the start point lies in the middle of the closing edge (0, 0) -> (2, 0)
+        hull = _simplified_hull(self.points((1, 0), (2, 0), (2, 2), (0, 2), (0, 0)), 0.5)
+        self.assertEqual([(2.0, 0.0), (2.0, 2.0), (0.0, 2.0), (0.0, 0.0)], hull)
+    
+    def test_straight_run_before_start_point_dropped(self):
+        # the last point lies in the middle of the closing edge (0, 2) -> (0, 0)
+        hull = _simplified_hull(self.points((0, 0), (2, 0), (2, 2), (0, 2), (0, 1)), 0.5)
+        self.assertEqual([(0.0, 0.0), (2.0, 0.0), (2.0, 2.0), (0.0, 2.0)], hull)
+    
+    def test_sub_tolerance_polygon_collapses_to_single_point(self):
+        hull = _simplified_hull(self.points((0, 0), (0.1, 0), (0.1, 0.1), (0, 0.1)), 0.5)
+        self.assertEqual([(0.0, 0.0)], hull)
+    
+    def test_spike_doubling_back_kept(self):
+        # (2, 0) -> (1, 0) goes back on the same line, the spike is still visible as a stroke
+        hull = _simplified_hull(self.points((0, 0), (2, 0), (1, 0), (1, 1)), 0.5)
+        self.assertEqual([(0.0, 0.0), (2.0, 0.0), (1.0, 0.0), (1.0, 1.0)], hull)
+
+#--------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    unittest.main()